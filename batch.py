@@ -0,0 +1,350 @@
+# Batch solver over puzzle files in the one-line format
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from bitboard import PROPAGATION, BitBoard
+from cache import SolutionCache
+from packedfile import PackedPuzzles, isPacked
+from canonical import canonicalForm
+from profiling import SolverStats
+from puzzlefile import formatPuzzle, lineUnit, readPuzzles
+from search import SEARCH_ENGINE, SEARCH_LIMIT, createSearch
+from tracing import JsonTrace
+
+# Solver for a stream of puzzles, reusing one BitBoard per board size
+class BatchSolver:
+    # constructor
+    # limit is the number of solutions to stop at, None for all solutions
+    # trace is the sink of solver events, None for no trace
+    # stats is the SolverStats counting the work, None for no profiling
+    # cache is the SolutionCache of canonical puzzles, None for no cache
+    # vector is the number of puzzles propagated together with NumPy
+    # before the search, None to solve puzzles one by one
+    def __init__(self, propagation="queue", limit=None, engine="rules", trace=None, stats=None, cache=None, vector=None):
+        self.propagation = propagation
+        self.limit = limit
+        self.engine = engine
+        self.trace = trace
+        self.stats = stats
+        self.cache = cache
+        self.vector = vector
+        self.boardDict = dict()
+        self.vectorDict = dict()
+
+    # return a cleared BitBoard for a board unit
+    def board(self, unit):
+        board = self.boardDict.get(unit)
+        if board is None:
+            board = BitBoard(unit)
+            board.trace = self.trace
+            self.boardDict[unit] = board
+        board.stats = self.stats
+        board.clear()
+        return board
+
+    # Solve a puzzle given as a serial list
+    # return (status, grid, nSolution, exhausted), grid is the first solution
+    # or None, exhausted is false when the search stopped at the limit.
+    # Puzzles equivalent to a cached one are answered from the cache.
+    def solve(self, q):
+        if self.cache is None:
+            return self.solveBoard(q)
+        form = canonicalForm(q)
+        result = self.cacheGet(form)
+        if result is None:
+            result = self.solveBoard(q)
+            self.cachePut(form, result)
+        return result
+
+    # return the cached result of a puzzle of a CanonicalForm, None when missing
+    def cacheGet(self, form):
+        value = self.cache.get(self.cacheKey(form))
+        if value is None:
+            return None
+        (status, grid, nSolution, exhausted) = value
+        if grid is not None:
+            grid = form.fromCanonical(grid)
+        return (status, grid, nSolution, exhausted)
+
+    # Cache the result of a puzzle of a CanonicalForm
+    def cachePut(self, form, result):
+        (status, grid, nSolution, exhausted) = result
+        if grid is not None:
+            grid = form.toCanonical(grid)
+        self.cache.put(self.cacheKey(form), (status, grid, nSolution, exhausted))
+
+    # Key of a puzzle of a CanonicalForm in the cache
+    # The first solution of a puzzle with several solutions depends on the
+    # engine, the propagation and the vector pass, and the number of
+    # solutions on the limit.
+    def cacheKey(self, form):
+        return (self.engine, self.propagation, self.vector is not None, self.limit, form.key)
+
+    # Solve a list of puzzles given as serial lists, return the list of results of solve()
+    # Puzzles missing from the cache are propagated together by a
+    # VectorBoards, only the unresolved ones are searched.
+    def solveMany(self, qList):
+        resultList = [None] * len(qList)
+        formList = [None] * len(qList)
+        unitDict = dict()
+        for (i, q) in enumerate(qList):
+            if self.cache is not None:
+                formList[i] = canonicalForm(q)
+                resultList[i] = self.cacheGet(formList[i])
+                if resultList[i] is not None:
+                    continue
+            unit = lineUnit(len(q))
+            if unit is None:
+                raise ValueError("puzzle length %d is not a square board" % len(q))
+            unitDict.setdefault(unit, list()).append(i)
+        for (unit, indexList) in unitDict.items():
+            vector = self.vectorDict.get(unit)
+            if vector is None:
+                from vectorized import VectorBoards
+                vector = VectorBoards(unit)
+                self.vectorDict[unit] = vector
+            for (i, (status, grid)) in zip(indexList, vector.propagate([qList[i] for i in indexList])):
+                if status == "SOLVED":
+                    result = ("SOLVED", bytes(grid), 1, True)
+                elif status == "CONFLICTED":
+                    result = ("CONFLICTED", None, 0, True)
+                else:
+                    result = self.solveBoard(grid)
+                if self.cache is not None:
+                    self.cachePut(formList[i], result)
+                resultList[i] = result
+        return resultList
+
+    # Solve a puzzle on a board, see solve()
+    def solveBoard(self, q):
+        board = self.board(lineUnit(len(q)))
+        board.load(q)
+        if board.hasDuplicate():
+            return ("CONFLICTED", None, 0, True)
+        search = createSearch(board, self.engine, self.propagation)
+        # Solutions are streamed, only the first one is kept
+        first = None
+        nSolution = 0
+        stream = search.solutions()
+        for (snapshot, grid) in islice(stream, self.limit):
+            if first is None:
+                first = grid
+            nSolution = nSolution + 1
+        stream.close()
+        if first is not None:
+            return ("SOLVED", first, nSolution, search.exhausted)
+        return ("CONFLICTED", None, 0, True)
+
+    # Solve puzzles of a text stream one by one, yield (line, result)
+    def solveStream(self, stream):
+        return self.solvePuzzles(readPuzzles(stream))
+
+    # Solve puzzles given as (line, serial list) one by one, yield (line, result)
+    # With vector, puzzles are read and solved vector at a time.
+    def solvePuzzles(self, puzzles):
+        if self.vector is not None:
+            for chunk in chunkPuzzles(puzzles, self.vector):
+                yield from zip(
+                    [line for (line, q) in chunk],
+                    self.solveMany([q for (line, q) in chunk])
+                )
+            return
+        for (line, q) in puzzles:
+            if self.trace is not None:
+                self.trace.begin(line)
+            yield (line, self.solve(q))
+
+# Solver of a worker process, created once by initWorker()
+workerSolver = None
+
+def initWorker(propagation, limit, engine, profile=False, vector=None):
+    global workerSolver
+    workerSolver = BatchSolver(propagation, limit, engine, vector=vector)
+    if profile:
+        workerSolver.stats = SolverStats()
+
+# Solve a chunk of (line, serial list) in a worker process
+# return the list of (line, result) and the SolverStats of the chunk or None
+# A chunk is propagated together when the solver has a vector.
+def solveChunk(chunk):
+    if workerSolver.stats is not None:
+        workerSolver.stats = SolverStats()
+    if workerSolver.vector is not None:
+        resultList = workerSolver.solveMany([q for (line, q) in chunk])
+    else:
+        resultList = [workerSolver.solve(q) for (line, q) in chunk]
+    return (
+        list(zip([line for (line, q) in chunk], resultList)),
+        workerSolver.stats
+    )
+
+# Split puzzles given as (line, serial list) into lists of chunkSize puzzles
+def chunkPuzzles(puzzles, chunkSize):
+    chunk = list()
+    for puzzle in puzzles:
+        chunk.append(puzzle)
+        if len(chunk) >= chunkSize:
+            yield chunk
+            chunk = list()
+    if chunk:
+        yield chunk
+
+# Solve puzzles of a stream on a pool of worker processes, yield (line, result)
+def parallelSolveStream(stream, jobs, chunkSize=64, propagation="queue", limit=None, engine="rules", stats=None, vector=False):
+    return parallelSolvePuzzles(readPuzzles(stream), jobs, chunkSize, propagation, limit, engine, stats, vector)
+
+# Solve puzzles given as (line, serial list) on a pool of worker processes,
+# yield (line, result)
+# Results come in the order of the puzzles. At most 2 * jobs chunks are
+# in flight so that a large stream is never held in memory.
+# The work of the workers is added to stats when it is given.
+# vector propagates each chunk together with NumPy.
+def parallelSolvePuzzles(puzzles, jobs, chunkSize=64, propagation="queue", limit=None, engine="rules", stats=None, vector=False):
+    def collect(pendingResult):
+        (resultList, chunkStats) = pendingResult.get()
+        if chunkStats is not None:
+            stats.merge(chunkStats)
+        return resultList
+    initArgs = (propagation, limit, engine, stats is not None, chunkSize if vector else None)
+    with multiprocessing.Pool(jobs, initWorker, initArgs) as pool:
+        pending = deque()
+        for chunk in chunkPuzzles(puzzles, chunkSize):
+            pending.append(pool.apply_async(solveChunk, (chunk,)))
+            if len(pending) >= 2 * jobs:
+                yield from collect(pending.popleft())
+        while pending:
+            yield from collect(pending.popleft())
+
+# Format a result as a line: solution (or the puzzle), status and number of solutions
+# The number is followed by "+" when the search stopped at the limit.
+def formatLine(line, result):
+    (status, grid, nSolution, exhausted) = result
+    return "%s %s %d%s" % (
+        formatPuzzle(grid) if grid is not None else line,
+        status,
+        nSolution,
+        "" if exhausted else "+"
+    )
+
+# Format a result as a JSON object on a line
+def formatJson(line, result):
+    (status, grid, nSolution, exhausted) = result
+    return json.dumps({
+        "puzzle": line,
+        "status": status,
+        "solutions": nSolution,
+        "exhausted": exhausted,
+        "solution": formatPuzzle(grid) if grid is not None else None
+    })
+
+FORMATTER = {
+    "line": formatLine,
+    "json": formatJson
+}
+
+# Puzzles of each input file as (line, serial list), "-" for stdin
+# Packed files are read from a memory map, other files in the one-line format.
+def readInputs(fileList):
+    for fileName in fileList:
+        if fileName == "-":
+            yield readPuzzles(sys.stdin)
+        elif isPacked(fileName):
+            with PackedPuzzles(fileName) as packed:
+                yield packed.readPuzzles()
+        else:
+            with open(fileName) as stream:
+                yield readPuzzles(stream)
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve puzzles in the one-line format")
+    parser.add_argument("files", nargs="*", default=["-"], help="puzzle files in the one-line or packed format, - for stdin")
+    parser.add_argument("--format", choices=list(FORMATTER), default="line")
+    parser.add_argument("--engine", choices=SEARCH_ENGINE, default="rules")
+    parser.add_argument("--propagation", choices=list(PROPAGATION), default="queue")
+    parser.add_argument("--mode", choices=list(SEARCH_LIMIT) + ["count"], default="unique",
+        help="first solution, stop at 2 (uniqueness, the default), count up to --limit or all solutions")
+    parser.add_argument("--limit", type=int, default=None, help="number of solutions for --mode count")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=64, help="puzzles per worker task")
+    parser.add_argument("--trace", default=None, help="file to write solver events as JSON lines")
+    parser.add_argument("--stats", action="store_true", help="print per-rule counters and timing on stderr")
+    parser.add_argument("--cache-size", type=int, default=None, help="cache solutions of this many canonical puzzles")
+    parser.add_argument("--cache", default=None, help="file to load and save the solution cache")
+    parser.add_argument("--vector", action="store_true",
+        help="propagate each chunk of --chunk-size puzzles together with NumPy before the search")
+    args = parser.parse_args()
+    if args.trace is not None and args.jobs > 1:
+        parser.error("--trace requires --jobs 1")
+    if args.vector:
+        # NumPy is imported only when asked for
+        import vectorized
+        if not vectorized.available():
+            parser.error("--vector requires NumPy")
+        if args.trace is not None:
+            parser.error("--vector does not support --trace")
+    if (args.cache is not None or args.cache_size is not None) and args.jobs > 1:
+        parser.error("--cache and --cache-size require --jobs 1")
+    if args.mode == "count":
+        if args.limit is None or args.limit < 1:
+            parser.error("--mode count requires a positive --limit")
+        limit = args.limit
+    else:
+        limit = SEARCH_LIMIT[args.mode]
+    formatter = FORMATTER[args.format]
+    traceStream = open(args.trace, "w") if args.trace is not None else None
+    stats = SolverStats() if args.stats else None
+    cache = None
+    if args.cache is not None or args.cache_size is not None:
+        try:
+            cache = SolutionCache(args.cache_size) if args.cache_size is not None else SolutionCache()
+        except ValueError as e:
+            parser.error(str(e))
+        if args.cache is not None:
+            try:
+                cache.load(args.cache)
+            except ValueError as e:
+                parser.error(str(e))
+    solver = BatchSolver(
+        args.propagation, limit, args.engine,
+        JsonTrace(traceStream) if traceStream is not None else None,
+        stats, cache, args.chunk_size if args.vector else None
+    )
+    out = sys.stdout
+    nPuzzle = 0
+    t = time.perf_counter()
+    try:
+        for puzzles in readInputs(args.files):
+            if args.jobs > 1:
+                resultStream = parallelSolvePuzzles(
+                    puzzles, args.jobs, args.chunk_size, args.propagation, limit, args.engine, stats, args.vector
+                )
+            else:
+                resultStream = solver.solvePuzzles(puzzles)
+            for (line, result) in resultStream:
+                out.write(formatter(line, result))
+                out.write("\n")
+                nPuzzle = nPuzzle + 1
+    except ValueError as e:
+        sys.exit("%s: %s" % (parser.prog, e))
+    finally:
+        if traceStream is not None:
+            traceStream.close()
+    t = time.perf_counter() - t
+    print("%d puzzles in %.3f s (%.1f puzzles/s)" % (
+        nPuzzle, t, nPuzzle / t if t > 0 else 0.0
+    ), file=sys.stderr)
+    if stats is not None:
+        for line in stats.summary():
+            print(line, file=sys.stderr)
+    if cache is not None:
+        if args.cache is not None:
+            cache.save(args.cache)
+        print(cache.summary(), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+# Benchmarks for the Sudoku engine
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import timeit
+import tracemalloc
+
+import engine
+import bitboard
+import batch
+import parallel
+import branching
+import profiling
+import puzzlefile
+import search
+
+# Python snippet measuring the import of a module in a fresh interpreter
+IMPORT_SNIPPET = """
+import sys, time
+t = time.perf_counter()
+import %s
+t = time.perf_counter() - t
+print("%%f %%d" %% (t, "tkinter" in sys.modules))
+"""
+
+# Default puzzle of the parallel benchmark: Qhard without its first three
+# givens, 4486 solutions, a few seconds of exhaustive search
+PARALLEL_PUZZLE = "................2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97.."
+
+# Measure the import time of a module in fresh interpreters
+def importTime(module, repeat):
+    timeList = list()
+    tkinterLoaded = False
+    for i in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET % module],
+            check=True, capture_output=True, text=True
+        ).stdout.split()
+        timeList.append(float(output[0]))
+        tkinterLoaded = tkinterLoaded or output[1] == "1"
+    return (timeList, tkinterLoaded)
+
+def importBenchmark(args):
+    (timeList, tkinterLoaded) = importTime(args.module, args.repeat)
+    print("import %s: min %.3f ms, median %.3f ms, tkinter %s" % (
+        args.module,
+        min(timeList) * 1000,
+        statistics.median(timeList) * 1000,
+        "loaded" if tkinterLoaded else "not loaded"
+    ))
+
+# Measure a function call, returning (seconds, peak traced bytes, result)
+def measure(func):
+    tracemalloc.start()
+    t = time.perf_counter()
+    result = func()
+    t = time.perf_counter() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (t, peak, result)
+
+# A solve() call on a fresh board of an example puzzle for each engine
+def setSolver(name):
+    board = engine.exampleBoard(name)
+    def solve():
+        board.unassign()
+        return board.solve()
+    return solve
+
+def maskSolver(name, propagation="sweep"):
+    board = bitboard.BitBoard(engine.UNIT)
+    board.load(engine.EXAMPLES[name])
+    def solve():
+        board.unassign()
+        return board.solve(propagation)
+    return solve
+
+def queueSolver(name):
+    return maskSolver(name, "queue")
+
+SOLVERS = {
+    "set": setSolver,
+    "mask": maskSolver,
+    "queue": queueSolver
+}
+
+def solveBenchmark(args):
+    for name in args.puzzle or engine.EXAMPLES:
+        line = "%-6s" % name
+        for (engineName, solver) in SOLVERS.items():
+            func = solver(name)
+            (t, peak, status) = measure(func)
+            timeList = list()
+            for i in range(args.repeat):
+                t = time.perf_counter()
+                func()
+                timeList.append(time.perf_counter() - t)
+            line += " %s %-10s %8.3f ms %8d B" % (
+                engineName, status, min(timeList) * 1000, peak
+            )
+        print(line)
+
+# Throughput of the batch solver on a puzzle file for 1..jobs processes
+def batchBenchmark(args):
+    for jobs in range(1, args.jobs + 1):
+        with open(args.file) as stream:
+            t = time.perf_counter()
+            if jobs > 1:
+                resultStream = batch.parallelSolveStream(stream, jobs, args.chunk_size)
+            else:
+                resultStream = batch.BatchSolver().solveStream(stream)
+            nPuzzle = 0
+            for result in resultStream:
+                nPuzzle = nPuzzle + 1
+            t = time.perf_counter() - t
+        if jobs == 1:
+            base = t
+        print("jobs %2d: %d puzzles in %.3f s, %.1f puzzles/s, speedup %.2f" % (
+            jobs, nPuzzle, t, nPuzzle / t, base / t
+        ))
+
+# Wall-clock time of the parallel search of one example puzzle for 1..jobs
+# processes against the serial search
+def parallelBenchmark(args):
+    if args.puzzle is None:
+        q = puzzlefile.parsePuzzle(PARALLEL_PUZZLE)
+    else:
+        q = engine.EXAMPLES[args.puzzle]
+    board = bitboard.BitBoard(engine.UNIT)
+    board.load(q)
+    searcher = search.Search(board)
+    t = time.perf_counter()
+    searcher.run(limit=args.limit)
+    base = time.perf_counter() - t
+    print("serial : %d solutions, %d nodes in %.3f s" % (len(searcher.solutionList), searcher.nodes, base))
+    for jobs in range(1, args.jobs + 1):
+        searcher = parallel.ParallelSearch(q, jobs=jobs)
+        t = time.perf_counter()
+        searcher.run(limit=args.limit)
+        t = time.perf_counter() - t
+        print("jobs %2d: %d solutions, %d nodes, %d subproblems in %.3f s, speedup %.2f" % (
+            jobs, len(searcher.solutionList), searcher.nodes, searcher.tasks, t, base / t
+        ))
+
+# Cost of creating and resetting a board of each engine
+def boardBenchmark(args):
+    for (engineName, create) in (("set", engine.Board), ("mask", bitboard.BitBoard)):
+        create(args.unit)
+        t = timeit.timeit(lambda: create(args.unit), number=args.repeat) / args.repeat
+        board = create(args.unit)
+        reset = board.clear if hasattr(board, "clear") else board.resetNegative
+        r = timeit.timeit(reset, number=args.repeat) / args.repeat
+        print("%-4s unit %d: create %9.1f us, reset %7.1f us" % (
+            engineName, args.unit, t * 1e6, r * 1e6
+        ))
+
+# Nodes and time of each search engine on the example puzzles
+def searchBenchmark(args):
+    for name in args.puzzle or engine.EXAMPLES:
+        line = "%-6s" % name
+        for engineName in search.SEARCH_ENGINE:
+            board = bitboard.BitBoard(engine.UNIT)
+            board.load(engine.EXAMPLES[name])
+            searcher = search.createSearch(board, engineName)
+            t = time.perf_counter()
+            searcher.run(limit=args.limit)
+            t = time.perf_counter() - t
+            line += " %s %6d%s solutions %8d nodes %9.3f ms" % (
+                engineName,
+                len(searcher.solutionList),
+                " " if searcher.exhausted else "+",
+                searcher.nodes,
+                t * 1000
+            )
+        print(line)
+
+# Total time and nodes of each propagation strategy on a puzzle file and
+# on the search of the example puzzles
+def strategyBenchmark(args):
+    for propagation in bitboard.PROPAGATION:
+        line = "%-13s" % propagation
+        if args.file is not None:
+            solver = batch.BatchSolver(propagation, args.limit)
+            with open(args.file) as stream:
+                t = time.perf_counter()
+                nPuzzle = 0
+                for result in solver.solveStream(stream):
+                    nPuzzle = nPuzzle + 1
+                t = time.perf_counter() - t
+            line += " file %d puzzles %9.3f ms" % (nPuzzle, t * 1000)
+        nodes = 0
+        t = time.perf_counter()
+        for name in args.puzzle or engine.EXAMPLES:
+            board = bitboard.BitBoard(engine.UNIT)
+            board.load(engine.EXAMPLES[name])
+            searcher = search.Search(board, propagation)
+            searcher.run(limit=args.limit)
+            nodes += searcher.nodes
+        t = time.perf_counter() - t
+        line += " search %8d nodes %9.3f ms" % (nodes, t * 1000)
+        print(line)
+
+# Solution.appendStep() calls, nodes and time of the search on the example
+# puzzles with the basic rules and with the subset and fish rules
+def rulesBenchmark(args):
+    for name in args.puzzle or engine.EXAMPLES:
+        line = "%-6s" % name
+        for propagation in ("queue", "advanced"):
+            board = bitboard.BitBoard(engine.UNIT)
+            board.load(engine.EXAMPLES[name])
+            board.stats = profiling.SolverStats()
+            searcher = search.Search(board, propagation)
+            t = time.perf_counter()
+            searcher.run(limit=args.limit)
+            t = time.perf_counter() - t
+            line += " %s %6d steps %6d nodes %9.3f ms" % (
+                propagation, board.stats.branches, board.stats.nodes, t * 1000
+            )
+        print(line)
+
+# Search tree size and time of each branching heuristic, "scan" for the
+# scan of BitBoard.findFreeSquare(), on the example puzzles or a puzzle file
+def branchingBenchmark(args):
+    if args.file is not None:
+        with open(args.file) as stream:
+            puzzleList = [q for (line, q) in puzzlefile.readPuzzles(stream)]
+    else:
+        puzzleList = [engine.EXAMPLES[name] for name in args.puzzle or engine.EXAMPLES]
+    configList = [("scan", None)] + [
+        (tieBreak, valueOrder)
+        for tieBreak in branching.TIE_BREAK
+        for valueOrder in branching.VALUE_ORDER
+    ]
+    for (tieBreak, valueOrder) in configList:
+        stats = profiling.SolverStats()
+        t = time.perf_counter()
+        for q in puzzleList:
+            board = bitboard.BitBoard(puzzlefile.lineUnit(len(q)))
+            board.load(q)
+            board.stats = stats
+            if valueOrder is not None:
+                board.branching = branching.Branching(tieBreak, valueOrder)
+            else:
+                board.branching = None
+            search.Search(board, args.propagation).run(limit=args.limit)
+        t = time.perf_counter() - t
+        print("%-6s %-9s %8d steps %8d nodes %8d backtracks %9.3f ms" % (
+            tieBreak, valueOrder or "", stats.branches, stats.nodes, stats.backtracks, t * 1000
+        ))
+
+# A puzzle of any unit from a shuffled pattern grid, keeping givens at a ratio
+def patternPuzzle(unit, ratio, seed):
+    rand = random.Random(seed)
+    length = unit * unit
+    numberList = list(range(1, length + 1))
+    rand.shuffle(numberList)
+    q = list()
+    for row in range(length):
+        for col in range(length):
+            number = numberList[(unit * (row % unit) + row // unit + col) % length]
+            q.append(number if rand.random() < ratio else engine.BLANK)
+    return q
+
+# Ratios of givens of the size benchmark: empty, sparse and dense boards
+SIZE_RATIOS = (0.0, 0.3, 0.65)
+
+# First solution of pattern puzzles for each board size, ratio of givens
+# and engine. A search running longer than the timeout is stopped and
+# counted, its time is the timeout.
+def sizeBenchmark(args):
+    for unit in args.unit or [3, 4, 5, 6]:
+        for ratio in args.ratio or SIZE_RATIOS:
+            for engineName in search.SEARCH_ENGINE:
+                timeList = list()
+                nodes = 0
+                stopped = 0
+                for seed in range(args.repeat):
+                    board = bitboard.BitBoard(unit)
+                    board.load(patternPuzzle(unit, ratio, seed))
+                    searcher = search.createSearch(board, engineName)
+                    timer = threading.Timer(args.timeout, searcher.stop)
+                    timer.start()
+                    t = time.perf_counter()
+                    searcher.run(limit=1)
+                    timeList.append(time.perf_counter() - t)
+                    timer.cancel()
+                    nodes += searcher.nodes
+                    if searcher.stopped:
+                        stopped += 1
+                print("unit %d givens %3.0f%% %-5s median %9.3f ms, max %9.3f ms, %8.1f nodes, %d/%d stopped" % (
+                    unit, ratio * 100, engineName,
+                    statistics.median(timeList) * 1000,
+                    max(timeList) * 1000,
+                    nodes / args.repeat,
+                    stopped, args.repeat
+                ))
+
+# Engines of the suite: Board.solve() of the set engine alone, then the
+# ASSUME search of every search engine on a BitBoard
+SUITE_ENGINES = ("solve",) + search.SEARCH_ENGINE
+# Latency percentiles reported by the suite
+PERCENTILES = (50, 90, 99)
+# Version of the baseline file format
+BASELINE_VERSION = 2
+# Slowdown in ms below which a time is not a regression, whatever the ratio
+TIME_FLOOR_MS = 0.5
+
+# Nearest-rank percentile of a sorted list
+def percentile(sortedList, p):
+    rank = max(1, -(-len(sortedList) * p // 100))
+    return sortedList[rank - 1]
+
+# Prepare a run of a puzzle on a suite engine, return a function returning
+# the number of search nodes. Boards are built outside the timed function.
+def suiteRunner(engineName, q, limit):
+    unit = puzzlefile.lineUnit(len(q))
+    if engineName == "solve":
+        board = engine.Board(unit)
+        board.load(q)
+        def run():
+            board.solve()
+            return 0
+        return run
+    board = bitboard.BitBoard(unit)
+    board.load(q)
+    searcher = search.createSearch(board, engineName)
+    def run():
+        searcher.run(limit=limit)
+        return searcher.nodes
+    return run
+
+# Latency, throughput, nodes and peak memory of an engine on puzzles
+# Every puzzle is run repeat times on a fresh board, then once more under
+# tracemalloc for the peak memory, which is not timed.
+def suiteCase(engineName, puzzleList, repeat, limit):
+    timeList = list()
+    nodes = 0
+    for i in range(repeat):
+        for q in puzzleList:
+            run = suiteRunner(engineName, q, limit)
+            t = time.perf_counter()
+            n = run()
+            timeList.append(time.perf_counter() - t)
+            if i == 0:
+                nodes += n
+    tracemalloc.start()
+    for q in puzzleList:
+        suiteRunner(engineName, q, limit)()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timeList.sort()
+    total = sum(timeList)
+    record = {
+        "puzzles": len(puzzleList),
+        "runs": len(timeList),
+        "throughput": len(timeList) / total if total > 0 else 0.0,
+        "nodes": nodes,
+        "peak_bytes": peak,
+        "min_ms": timeList[0] * 1000,
+        "max_ms": timeList[-1] * 1000
+    }
+    for p in PERCENTILES:
+        record["p%d_ms" % p] = percentile(timeList, p) * 1000
+    return record
+
+# Cases of the suite: each example puzzle on its own and each corpus file
+# return a list of (name, puzzle list, repeat)
+def suiteCases(args):
+    caseList = [
+        (name, [engine.EXAMPLES[name]], args.repeat)
+        for name in args.puzzle or engine.EXAMPLES
+    ]
+    for fileName in args.files:
+        with open(fileName) as stream:
+            puzzleList = [q for (line, q) in puzzlefile.readPuzzles(stream)]
+        caseList.append((os.path.basename(fileName), puzzleList, args.file_repeat))
+    return caseList
+
+# true if a time in ms is slower than its baseline by more than tolerance
+# and by more than TIME_FLOOR_MS
+def slower(ms, baseMs, tolerance):
+    return ms > baseMs * (1 + tolerance) and ms - baseMs > TIME_FLOOR_MS
+
+# Regressions of a result against its baseline as a list of reasons
+# The fastest run and the median both slower than tolerance are a latency
+# regression, the fastest run being the least noisy time of a puzzle. A
+# mean time per run slower than tolerance is a throughput regression, and
+# any change of the search nodes, which do not depend on timing, is one too.
+def regressions(record, base, tolerance):
+    reasonList = list()
+    if slower(record["min_ms"], base["min_ms"], tolerance) and slower(record["p50_ms"], base["p50_ms"], tolerance):
+        reasonList.append("min %.3f ms > %.3f ms, p50 %.3f ms > %.3f ms" % (
+            record["min_ms"], base["min_ms"], record["p50_ms"], base["p50_ms"]
+        ))
+    if (record["throughput"] > 0 and base["throughput"] > 0
+            and slower(1000 / record["throughput"], 1000 / base["throughput"], tolerance)):
+        reasonList.append("throughput %.1f/s < %.1f/s" % (record["throughput"], base["throughput"]))
+    if record["nodes"] != base["nodes"]:
+        reasonList.append("nodes %d != %d" % (record["nodes"], base["nodes"]))
+    return reasonList
+
+# Run every case on every engine, optionally save the results as a
+# baseline or compare them with one; exit status 1 flags regressions
+def suiteBenchmark(args):
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as stream:
+            baseline = json.load(stream)
+        if baseline.get("version") != BASELINE_VERSION:
+            sys.exit("%s: unsupported baseline version %r" % (args.compare, baseline.get("version")))
+        # Nodes and times of searches stopping at other limits do not compare
+        if baseline.get("limit") != args.limit:
+            sys.exit("%s: baseline limit %r differs from --limit %r" % (args.compare, baseline.get("limit"), args.limit))
+    resultDict = dict()
+    nRegression = 0
+    for (name, puzzleList, repeat) in suiteCases(args):
+        for engineName in args.engine or SUITE_ENGINES:
+            key = "%s/%s" % (name, engineName)
+            record = suiteCase(engineName, puzzleList, repeat, args.limit)
+            resultDict[key] = record
+            line = "%-24s %s %10.1f/s %8d nodes %10d B" % (
+                key,
+                " ".join("p%d %9.3f ms" % (p, record["p%d_ms" % p]) for p in PERCENTILES),
+                record["throughput"], record["nodes"], record["peak_bytes"]
+            )
+            if baseline is not None:
+                base = baseline["results"].get(key)
+                if base is None:
+                    line += " (no baseline)"
+                else:
+                    reasonList = regressions(record, base, args.tolerance)
+                    if reasonList:
+                        nRegression = nRegression + 1
+                        line += " REGRESSION " + ", ".join(reasonList)
+            print(line)
+    if args.save is not None:
+        with open(args.save, "w") as stream:
+            json.dump({
+                "version": BASELINE_VERSION,
+                "python": sys.version.split()[0],
+                "limit": args.limit,
+                "results": resultDict
+            }, stream, indent=1, sort_keys=True)
+            stream.write("\n")
+    if baseline is not None:
+        print("%d regressions against %s" % (nRegression, args.compare))
+        if nRegression:
+            sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sudoku engine benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    parser_import = subparsers.add_parser("import", help="import time of a module")
+    parser_import.add_argument("--module", default="engine")
+    parser_import.add_argument("--repeat", type=int, default=10)
+    parser_import.set_defaults(func=importBenchmark)
+    parser_solve = subparsers.add_parser("solve", help="Board.solve() per engine on example puzzles")
+    parser_solve.add_argument("--puzzle", action="append", choices=list(engine.EXAMPLES))
+    parser_solve.add_argument("--repeat", type=int, default=10)
+    parser_solve.set_defaults(func=solveBenchmark)
+    parser_batch = subparsers.add_parser("batch", help="batch throughput for 1..N worker processes")
+    parser_batch.add_argument("file", help="puzzle file in the one-line format")
+    parser_batch.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser_batch.add_argument("--chunk-size", type=int, default=64)
+    parser_batch.set_defaults(func=batchBenchmark)
+    parser_parallel = subparsers.add_parser("parallel", help="parallel search of one puzzle for 1..N worker processes")
+    parser_parallel.add_argument("--puzzle", choices=list(engine.EXAMPLES), default=None,
+        help="example puzzle, Qhard without three givens by default")
+    parser_parallel.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser_parallel.add_argument("--limit", type=int, default=10000, help="stop at this number of solutions")
+    parser_parallel.set_defaults(func=parallelBenchmark)
+    parser_board = subparsers.add_parser("board", help="board creation and reset cost")
+    parser_board.add_argument("--unit", type=int, default=engine.UNIT)
+    parser_board.add_argument("--repeat", type=int, default=1000)
+    parser_board.set_defaults(func=boardBenchmark)
+    parser_search = subparsers.add_parser("search", help="search engines on example puzzles")
+    parser_search.add_argument("--puzzle", action="append", choices=list(engine.EXAMPLES))
+    parser_search.add_argument("--limit", type=int, default=1000, help="stop at this number of solutions")
+    parser_search.set_defaults(func=searchBenchmark)
+    parser_size = subparsers.add_parser("size", help="first solution per board size")
+    parser_size.add_argument("--unit", type=int, action="append")
+    parser_size.add_argument("--ratio", type=float, action="append",
+        help="ratio of givens, 0, 0.3 and 0.65 by default")
+    parser_size.add_argument("--repeat", type=int, default=5)
+    parser_size.add_argument("--timeout", type=float, default=5.0, help="seconds before a search is stopped")
+    parser_size.set_defaults(func=sizeBenchmark)
+    parser_strategy = subparsers.add_parser("strategy", help="propagation strategies on a puzzle file and the search")
+    parser_strategy.add_argument("file", nargs="?", default=None, help="puzzle file in the one-line format")
+    parser_strategy.add_argument("--puzzle", action="append", choices=list(engine.EXAMPLES))
+    parser_strategy.add_argument("--limit", type=int, default=2, help="stop at this number of solutions")
+    parser_strategy.set_defaults(func=strategyBenchmark)
+    parser_rules = subparsers.add_parser("rules", help="search steps with and without the subset and fish rules")
+    parser_rules.add_argument("--puzzle", action="append", choices=list(engine.EXAMPLES))
+    parser_rules.add_argument("--limit", type=int, default=1000, help="stop at this number of solutions")
+    parser_rules.set_defaults(func=rulesBenchmark)
+    parser_branching = subparsers.add_parser("branching", help="search tree size per branching heuristic")
+    parser_branching.add_argument("file", nargs="?", default=None, help="puzzle file in the one-line format")
+    parser_branching.add_argument("--puzzle", action="append", choices=list(engine.EXAMPLES))
+    parser_branching.add_argument("--propagation", choices=list(bitboard.PROPAGATION), default="queue")
+    parser_branching.add_argument("--limit", type=int, default=1000, help="stop at this number of solutions")
+    parser_branching.set_defaults(func=branchingBenchmark)
+    parser_suite = subparsers.add_parser("suite", help="latency, throughput, nodes and memory per engine with a baseline")
+    parser_suite.add_argument("files", nargs="*", help="corpus files in the one-line format")
+    parser_suite.add_argument("--puzzle", action="append", choices=list(engine.EXAMPLES))
+    parser_suite.add_argument("--engine", action="append", choices=SUITE_ENGINES)
+    parser_suite.add_argument("--limit", type=int, default=1000, help="stop the search at this number of solutions")
+    parser_suite.add_argument("--repeat", type=int, default=50, help="runs of each example puzzle")
+    parser_suite.add_argument("--file-repeat", type=int, default=1, help="runs of each puzzle of a corpus file")
+    parser_suite.add_argument("--save", default=None, help="write the results to a JSON baseline file")
+    parser_suite.add_argument("--compare", default=None, help="flag regressions against a JSON baseline file")
+    parser_suite.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown ratio before a regression")
+    parser_suite.set_defaults(func=suiteBenchmark)
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
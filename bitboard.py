@@ -0,0 +1,884 @@
+# Sudoku solving engine with bitmask candidates
+# The negative set of every Square is an integer, bit (n - 1) stands for number n.
+# Squares are addressed by their serial index row * length + col.
+
+from array import array
+from collections import deque
+from itertools import combinations
+from time import perf_counter
+
+from engine import BLANK
+from topology import topology
+from tracing import (
+    TraceEvent, RULE_LAST_POSITIVE, RULE_LAST_IN_GROUP, RULE_NEGATE_BULK, RULE_NEGATE_LINEAR,
+    RULE_INDIRECT_CLUSTER, RULE_NAKED_SUBSET, RULE_HIDDEN_SUBSET, RULE_FISH
+)
+
+# Status of a Square
+FREE = 0
+FIXED = 1
+ASSIGNED = 2
+STATUS_NAME = ("free", "fixed", "assigned")
+
+# Largest subset of Squares or numbers tried by the naked and hidden subset rules
+SUBSET_SIZE = 3
+# Largest number of lines tried by the fish rule, 2 for X-Wing and 3 for Swordfish
+FISH_SIZE = 3
+# Smallest unit whose boards search with the buckets of a Branching by default
+# The scan of findFreeSquare() fills a large board row by row and gets stuck
+# deep in the tree, the first solution of an empty 36x36 board is not found
+# in minutes while the buckets find it in about a second.
+BRANCHING_UNIT = 5
+
+# Count the number of bits in a mask
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:
+    def popcount(mask):
+        return bin(mask).count("1")
+
+# The lowest bit of a mask
+def lowestBit(mask):
+    return mask & -mask
+
+# The number represented by the lowest bit of a mask
+def lowestNumber(mask):
+    return (mask & -mask).bit_length()
+
+# The bit representing a number
+def numberBit(number):
+    return 1 << (number - 1)
+
+# Numbers represented by a mask in ascending order
+def maskNumbers(mask):
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length()
+        mask ^= bit
+
+# board class with bitmask negative sets
+class BitBoard:
+    __slots__ = (
+        "topology", "unit", "length", "size", "fullMask", "numberSet",
+        "clusterSquares", "groupSquares", "linearOthers", "bulkOthers",
+        "linearOtherSquares", "bulkOtherSquares",
+        "squareGroups", "squareNeighborClusters", "peers",
+        "number", "status", "f_negative", "trail", "trace", "depth", "stats", "branching"
+    )
+
+    # constructor
+    def __init__(self, unit):
+        # Index tables shared by all boards of the same unit
+        self.topology = topology(unit)
+        self.unit = unit
+        self.length = self.topology.length
+        self.size = self.topology.size
+        self.fullMask = self.topology.fullMask
+        self.numberSet = self.topology.numberSet
+        self.clusterSquares = self.topology.clusterSquares
+        self.groupSquares = self.topology.groupSquares
+        self.linearOthers = self.topology.linearOthers
+        self.bulkOthers = self.topology.bulkOthers
+        self.linearOtherSquares = self.topology.linearOtherSquares
+        self.bulkOtherSquares = self.topology.bulkOtherSquares
+        self.squareGroups = self.topology.squareGroups
+        self.squareNeighborClusters = self.topology.squareNeighborClusters
+        self.peers = self.topology.peers
+        # Mutable state of Squares
+        self.number = list(self.topology.zeros)
+        self.status = list(self.topology.zeros)
+        self.f_negative = list(self.topology.zeros)
+        # Changes made by propagation as (index, negative, status) before the change
+        self.trail = list()
+        # Sink of solver events, None for no trace
+        self.trace = None
+        # Search depth reported in events
+        self.depth = 0
+        # SolverStats counting the work of the rules, None for no profiling
+        self.stats = None
+        # Branching choosing the Square and numbers of a search step,
+        # None for a scan of the board
+        if unit >= BRANCHING_UNIT:
+            from branching import Branching
+            self.branching = Branching()
+        else:
+            self.branching = None
+
+    # Fix numbers given as a serial list, BLANK for a free Square
+    def load(self, q):
+        for i in range(len(q)):
+            if q[i] != BLANK:
+                self.assign(i, q[i], FIXED)
+
+    # Copy numbers and status from a Board
+    def loadBoard(self, board):
+        for square in board.squareList():
+            index = self.square(square.col, square.row)
+            if square.status == "free":
+                self.free(index)
+            else:
+                self.assign(index, square.number, STATUS_NAME.index(square.status))
+
+    # Copy numbers, status and negative sets to a Board
+    # Squares already equal are left alone, so only the changed ones are
+    # marked dirty for a redraw.
+    def storeBoard(self, board):
+        for square in board.squareList():
+            index = self.square(square.col, square.row)
+            negative = set(maskNumbers(self.f_negative[index]))
+            if self.status[index] == FREE:
+                if square.status != "free":
+                    square.unassign()
+            else:
+                number = self.number[index]
+                status = STATUS_NAME[self.status[index]]
+                if square.number != number or square.status != status:
+                    square.assign(number, status)
+            if square.negative() != negative:
+                square.resetNegative()
+                square.updateNegative(negative)
+
+    # Store numbers, status and negative sets of all Squares into bytes
+    # The layout is number[size], status[size] and negative[size] in
+    # native byte order, so a snapshot is only valid on the same host.
+    def snapshot(self):
+        return (
+            bytes(self.number)
+            + bytes(self.status)
+            + array(self.topology.maskTypecode, self.f_negative).tobytes()
+        )
+
+    # Restore the state of all Squares from snapshot()
+    def restore(self, buffer):
+        size = self.size
+        if len(buffer) != self.topology.snapshotSize:
+            raise ValueError("snapshot of %d bytes does not fit the board" % len(buffer))
+        view = memoryview(buffer)
+        self.number[:] = view[:size]
+        self.status[:] = view[size:2 * size]
+        self.f_negative[:] = view[2 * size:].cast(self.topology.maskTypecode)
+        self.trail.clear()
+        if self.branching is not None:
+            self.branching.rebuild(self)
+
+    # return the index of a Square on the board
+    def square(self, col, row):
+        return row * self.length + col
+
+    # return the location of a Square
+    def location(self, index):
+        return divmod(index, self.length)[::-1]
+
+    # Assign a number to a Square
+    def assign(self, index, number, status=ASSIGNED):
+        assert(number in self.numberSet)
+        self.number[index] = number
+        self.status[index] = status
+
+    # Make a Square free
+    def free(self, index):
+        self.number[index] = 0
+        self.status[index] = FREE
+
+    # Make all Square free
+    def clear(self):
+        zeros = self.topology.zeros
+        self.number[:] = zeros
+        self.status[:] = zeros
+        self.f_negative[:] = zeros
+        self.trail.clear()
+
+    # Unassign all "assigned" Square
+    def unassign(self):
+        for index in range(self.size):
+            if self.status[index] == ASSIGNED:
+                self.free(index)
+
+    def resetNegative(self):
+        self.f_negative[:] = self.topology.zeros
+
+    def negative(self, index):
+        return self.f_negative[index]
+
+    # a mask of numbers still possible at a Square
+    def positive(self, index):
+        return self.fullMask & ~self.f_negative[index]
+
+    # a list of numbers still possible at a Square
+    def choiceList(self, index):
+        if self.branching is not None:
+            return self.branching.choiceList(self, index)
+        return list(maskNumbers(self.positive(index)))
+
+    # add negative flag to the Square and its peers
+    def negateGroup(self, index):
+        negative = self.f_negative
+        negative[index] = self.fullMask
+        bit = 1 << (self.number[index] - 1)
+        for peer in self.peers[index]:
+            negative[peer] |= bit
+
+    # true if a number appears twice in a Group among non-free Squares
+    def hasDuplicate(self):
+        for squares in self.groupSquares:
+            mask = 0
+            for index in squares:
+                if self.status[index] != FREE:
+                    bit = 1 << (self.number[index] - 1)
+                    if mask & bit:
+                        return True
+                    mask |= bit
+        return False
+
+    # Find a free Square with longest negative
+    # A Square with two positive numbers can not be beaten after propagation.
+    def findFreeSquare(self):
+        if self.branching is not None:
+            return self.branching.findFreeSquare(self)
+        found = None
+        nNegative = -1
+        best = self.length - 2
+        status = self.status
+        negative = self.f_negative
+        for index in range(self.size):
+            if status[index] == FREE:
+                count = popcount(negative[index])
+                if count > nNegative:
+                    found = index
+                    nNegative = count
+                    if count >= best:
+                        break
+        return found
+
+    # Solver function, follows the rules of Board.solve()
+    # propagation selects a strategy of PROPAGATION running the rules to a fixpoint
+    def solve(self, propagation="sweep"):
+        if propagation not in PROPAGATION:
+            raise ValueError("unknown propagation %r" % propagation)
+        # Clear all negative set
+        self.resetNegative()
+        self.trail.clear()
+        # initialize negative set
+        for index in range(self.size):
+            if self.status[index] != FREE:
+                self.negateGroup(index)
+        # The worklist rules keep the buckets up to date, full passes do not
+        if self.branching is not None:
+            self.branching.rebuild(self)
+        if not PROPAGATION[propagation](self):
+            return "CONFLICTED"
+        if self.branching is not None:
+            self.branching.rebuild(self)
+        return self.checkStatus()
+
+    # Apply the rules in full passes until nothing changes
+    # Every pass runs Solver #1, #2 and #3 in the order of Board.solve().
+    # return False when a conflict is found
+    def sweep(self):
+        if self.stats is not None:
+            self.stats.propagations += 1
+        solved = False  # Flag indicating solver completion
+        while not solved:
+            changed = self.sweepLastPositive()
+            if changed is None:
+                return False
+            changed = self.sweepLastInGroup() or changed
+            changed = self.sweepIndirectCluster() or changed
+            solved = not changed
+        return True
+
+    # Apply Solver #1 and #2 until nothing changes before each pass of Solver #3
+    # return False when a conflict is found
+    def sweepCheapFirst(self):
+        if self.stats is not None:
+            self.stats.propagations += 1
+        while True:
+            if not self.sweepSingles(False):
+                return False
+            if not self.sweepIndirectCluster():
+                return True
+
+    # Apply Solver #1 and #2 in full passes until nothing changes
+    # return False when a conflict is found
+    def sweepSingles(self, count=True):
+        if count and self.stats is not None:
+            self.stats.propagations += 1
+        solved = False  # Flag indicating solver completion
+        while not solved:
+            changed = self.sweepLastPositive()
+            if changed is None:
+                return False
+            changed = self.sweepLastInGroup() or changed
+            solved = not changed
+        return True
+
+    # Solver #1: Last positive, a pass over all Squares
+    # return True when a Square is assigned, None when a conflict is found
+    def sweepLastPositive(self):
+        status = self.status
+        negative = self.f_negative
+        number = self.number
+        size = self.size
+        length = self.length
+        fullMask = self.fullMask
+        trace = self.trace
+        stats = self.stats
+        if stats is not None:
+            t = perf_counter()
+        changed = False
+        for index in range(size):
+            if status[index] == FREE:
+                nPositive = length - popcount(negative[index])
+                if nPositive == 0:
+                    if stats is not None:
+                        stats.lap(RULE_LAST_POSITIVE, t)
+                    return None
+                elif nPositive == 1:
+                    n = (fullMask & ~negative[index]).bit_length()
+                    if stats is not None:
+                        stats.fire(RULE_LAST_POSITIVE, self.placeEliminations(index, n))
+                    number[index] = n
+                    status[index] = ASSIGNED
+                    if trace is not None:
+                        self.traceEvent(RULE_LAST_POSITIVE, index, [n])
+                    self.negateGroup(index)
+                    changed = True
+        if stats is not None:
+            stats.passes += 1
+            stats.visits[RULE_LAST_POSITIVE] += size
+            stats.lap(RULE_LAST_POSITIVE, t)
+        return changed
+
+    # Solver #2: Last positive in group, a pass over all numbers and Groups
+    # return True when a Square is assigned
+    def sweepLastInGroup(self):
+        status = self.status
+        negative = self.f_negative
+        number = self.number
+        length = self.length
+        trace = self.trace
+        stats = self.stats
+        if stats is not None:
+            t = perf_counter()
+        changed = False
+        for n in range(1, length + 1):
+            bit = 1 << (n - 1)
+            for squares in self.groupSquares:
+                found = None
+                nPositive = 0
+                for index in squares:
+                    if status[index] == FREE and not negative[index] & bit:
+                        found = index
+                        nPositive = nPositive + 1
+                if nPositive == 1:
+                    if stats is not None:
+                        stats.fire(RULE_LAST_IN_GROUP, self.placeEliminations(found, n))
+                    number[found] = n
+                    status[found] = ASSIGNED
+                    if trace is not None:
+                        self.traceEvent(RULE_LAST_IN_GROUP, found, [n])
+                    self.negateGroup(found)
+                    changed = True
+        if stats is not None:
+            stats.visits[RULE_LAST_IN_GROUP] += length * len(self.groupSquares)
+            stats.lap(RULE_LAST_IN_GROUP, t)
+        return changed
+
+    # Solver #3: Indirect negative cluster, a pass over all Clusters
+    # return True when a negative set is changed
+    def sweepIndirectCluster(self):
+        negative = self.f_negative
+        fullMask = self.fullMask
+        trace = self.trace
+        stats = self.stats
+        if stats is not None:
+            t = perf_counter()
+        changed = False
+        for cluster in range(len(self.clusterSquares)):
+            own = fullMask
+            for index in self.clusterSquares[cluster]:
+                own &= negative[index]
+            if own == fullMask:
+                continue
+            for (sameSquares, crossSquares, rule) in (
+                (self.linearOtherSquares[cluster], self.bulkOtherSquares[cluster], RULE_NEGATE_BULK),
+                (self.bulkOtherSquares[cluster], self.linearOtherSquares[cluster], RULE_NEGATE_LINEAR)
+            ):
+                # Numbers negative in all other Clusters of a Group but not in this Cluster
+                positive = fullMask & ~own
+                for index in sameSquares:
+                    positive &= negative[index]
+                    if not positive:
+                        break
+                if positive:
+                    for index in crossSquares:
+                        if positive & ~negative[index]:
+                            if trace is not None:
+                                self.traceEvent(rule, index, list(maskNumbers(positive)))
+                            if stats is not None:
+                                stats.fire(RULE_INDIRECT_CLUSTER, popcount(positive & ~negative[index]))
+                            negative[index] |= positive
+                            changed = True
+        if stats is not None:
+            stats.visits[RULE_INDIRECT_CLUSTER] += len(self.clusterSquares)
+            stats.lap(RULE_INDIRECT_CLUSTER, t)
+        return changed
+
+    # Apply the rules only to Squares, Groups and Clusters touched by a change
+    # All Squares are visited when no worklist is given.
+    # return False when a conflict is found
+    def propagate(self, worklist=None):
+        status = self.status
+        negative = self.f_negative
+        fullMask = self.fullMask
+        trace = self.trace
+        stats = self.stats
+        if worklist is None:
+            worklist = Worklist(self)
+            worklist.pushAll()
+        if stats is not None:
+            stats.propagations += 1
+            stats.passes += 1
+            rule = None
+            t = perf_counter()
+        while True:
+            kind, key = worklist.pop()
+            if stats is not None:
+                # Close the timing of the previous work
+                t = stats.lap(rule, t)
+                rule = WORK_RULE[kind]
+                if rule is not None:
+                    stats.visits[rule] += 1
+            if kind == WORK_SQUARE:
+                # Solver #1: Last positive
+                if status[key] == FREE:
+                    positive = fullMask & ~negative[key]
+                    if positive == 0:
+                        if stats is not None:
+                            stats.lap(rule, t)
+                        return False
+                    if positive & (positive - 1) == 0:
+                        if stats is not None:
+                            stats.fire(RULE_LAST_POSITIVE, self.placeEliminations(key, positive.bit_length()))
+                        if trace is not None:
+                            self.traceEvent(RULE_LAST_POSITIVE, key, [positive.bit_length()])
+                        self.place(key, positive.bit_length(), worklist)
+            elif kind == WORK_GROUP:
+                # Solver #2: Last positive in group
+                squares = self.groupSquares[key]
+                once = 0
+                twice = 0
+                for index in squares:
+                    if status[index] == FREE:
+                        positive = fullMask & ~negative[index]
+                        twice |= once & positive
+                        once |= positive
+                for n in maskNumbers(once & ~twice):
+                    bit = 1 << (n - 1)
+                    found = None
+                    nPositive = 0
+                    for index in squares:
+                        if status[index] == FREE and not negative[index] & bit:
+                            found = index
+                            nPositive = nPositive + 1
+                    if nPositive == 1:
+                        if stats is not None:
+                            stats.fire(RULE_LAST_IN_GROUP, self.placeEliminations(found, n))
+                        if trace is not None:
+                            self.traceEvent(RULE_LAST_IN_GROUP, found, [n])
+                        self.place(found, n, worklist)
+            elif kind == WORK_CLUSTER:
+                # Solver #3: Indirect negative cluster
+                own = fullMask
+                for index in self.clusterSquares[key]:
+                    own &= negative[index]
+                if own == fullMask:
+                    continue
+                for (sameSquares, crossSquares, negateRule) in (
+                    (self.linearOtherSquares[key], self.bulkOtherSquares[key], RULE_NEGATE_BULK),
+                    (self.bulkOtherSquares[key], self.linearOtherSquares[key], RULE_NEGATE_LINEAR)
+                ):
+                    positive = fullMask & ~own
+                    for index in sameSquares:
+                        positive &= negative[index]
+                        if not positive:
+                            break
+                    if positive:
+                        for index in crossSquares:
+                            if positive & ~negative[index]:
+                                if trace is not None:
+                                    self.traceEvent(negateRule, index, list(maskNumbers(positive)))
+                                if stats is not None:
+                                    stats.fire(RULE_INDIRECT_CLUSTER, popcount(positive & ~negative[index]))
+                                self.eliminate(index, positive, worklist)
+            elif not worklist.advanced or not self.propagateAdvanced(worklist):
+                return True
+
+    # the number of candidates removed by placing a number at a free Square
+    def placeEliminations(self, index, n):
+        negative = self.f_negative
+        bit = 1 << (n - 1)
+        count = popcount(self.fullMask & ~negative[index]) - 1
+        for peer in self.peers[index]:
+            if not negative[peer] & bit:
+                count = count + 1
+        return count
+
+    # Send an event of a rule at a Square to the trace
+    def traceEvent(self, rule, index, numbers, status=None):
+        self.trace.emit(TraceEvent(rule, self.location(index), numbers, self.depth, status))
+
+    # Assign a number found by a rule and negate it in the peers
+    def place(self, index, n, worklist):
+        negative = self.f_negative
+        status = self.status
+        trail = self.trail
+        branching = self.branching
+        trail.append((index, negative[index], status[index]))
+        if branching is not None:
+            branching.update(index, negative[index], self.fullMask)
+        self.number[index] = n
+        status[index] = ASSIGNED
+        negative[index] = self.fullMask
+        worklist.pushSquare(index)
+        bit = 1 << (n - 1)
+        for peer in self.peers[index]:
+            if not negative[peer] & bit:
+                trail.append((peer, negative[peer], status[peer]))
+                if branching is not None:
+                    branching.update(peer, negative[peer], negative[peer] | bit)
+                negative[peer] |= bit
+                worklist.pushSquare(peer)
+
+    # Add numbers to the negative set of a Square
+    def eliminate(self, index, mask, worklist):
+        negative = self.f_negative
+        self.trail.append((index, negative[index], self.status[index]))
+        if self.branching is not None:
+            self.branching.update(index, negative[index], negative[index] | mask)
+        negative[index] |= mask
+        worklist.pushSquare(index)
+
+    # Apply Solver #1 and #2 only to Squares and Groups touched by a change
+    # return False when a conflict is found
+    def propagateSingles(self, worklist=None):
+        if worklist is None:
+            worklist = Worklist(self, False)
+            worklist.pushAll()
+        return self.propagate(worklist)
+
+    # Apply Solver #1 to #6 to Squares, Groups and Clusters touched by a change
+    # The subset and fish rules scan the board at each fixpoint of the others.
+    # return False when a conflict is found
+    def propagateAll(self, worklist=None):
+        if worklist is None:
+            worklist = Worklist(self, True, True)
+            worklist.pushAll()
+        return self.propagate(worklist)
+
+    # Apply the subset and fish rules once the other rules reach a fixpoint
+    # Rules are tried from the cheapest, the first one removing candidates
+    # returns so that Solver #1, #2 and #3 run on its changes first.
+    # return True when a negative set is changed
+    def propagateAdvanced(self, worklist):
+        return (
+            self.nakedSubsets(worklist)
+            or self.hiddenSubsets(worklist)
+            or self.fish(worklist)
+        )
+
+    # Solver #4: Naked subset
+    # When k free Squares of a Group have only k positive numbers in total,
+    # the other Squares of the Group have the k numbers in their negative set.
+    # return True when a negative set is changed
+    def nakedSubsets(self, worklist):
+        status = self.status
+        negative = self.f_negative
+        fullMask = self.fullMask
+        trace = self.trace
+        stats = self.stats
+        if stats is not None:
+            t = perf_counter()
+            stats.visits[RULE_NAKED_SUBSET] += len(self.topology.houseGroups)
+        found = False
+        for group in self.topology.houseGroups:
+            freeList = [index for index in self.groupSquares[group] if status[index] == FREE]
+            candidateList = [
+                index for index in freeList
+                if popcount(fullMask & ~negative[index]) <= SUBSET_SIZE
+            ]
+            for k in range(2, min(SUBSET_SIZE, len(freeList) - 1) + 1):
+                for subset in combinations(candidateList, k):
+                    mask = 0
+                    for index in subset:
+                        mask |= fullMask & ~negative[index]
+                    if popcount(mask) != k:
+                        continue
+                    for index in freeList:
+                        if index not in subset and mask & ~negative[index]:
+                            if trace is not None:
+                                self.traceEvent(RULE_NAKED_SUBSET, index, list(maskNumbers(mask & ~negative[index])))
+                            if stats is not None:
+                                stats.fire(RULE_NAKED_SUBSET, popcount(mask & ~negative[index]))
+                            self.eliminate(index, mask, worklist)
+                            found = True
+                    if found:
+                        break
+                if found:
+                    break
+            if found:
+                break
+        if stats is not None:
+            stats.lap(RULE_NAKED_SUBSET, t)
+        return found
+
+    # Solver #5: Hidden subset
+    # When k numbers are positive in only k free Squares of a Group,
+    # the k Squares have all other numbers in their negative set.
+    # return True when a negative set is changed
+    def hiddenSubsets(self, worklist):
+        status = self.status
+        negative = self.f_negative
+        fullMask = self.fullMask
+        length = self.length
+        trace = self.trace
+        stats = self.stats
+        if stats is not None:
+            t = perf_counter()
+            stats.visits[RULE_HIDDEN_SUBSET] += len(self.topology.houseGroups)
+        found = False
+        for group in self.topology.houseGroups:
+            squares = self.groupSquares[group]
+            # Positions in the Group where each number is positive
+            where = [0] * length
+            nFree = 0
+            for position in range(len(squares)):
+                index = squares[position]
+                if status[index] == FREE:
+                    nFree = nFree + 1
+                    for n in maskNumbers(fullMask & ~negative[index]):
+                        where[n - 1] |= 1 << position
+            numberList = [n for n in range(1, length + 1) if 2 <= popcount(where[n - 1]) <= SUBSET_SIZE]
+            for k in range(2, min(SUBSET_SIZE, nFree - 1) + 1):
+                for subset in combinations(numberList, k):
+                    positions = 0
+                    keep = 0
+                    for n in subset:
+                        positions |= where[n - 1]
+                        keep |= 1 << (n - 1)
+                    if popcount(positions) != k:
+                        continue
+                    for position in maskNumbers(positions):
+                        index = squares[position - 1]
+                        extra = fullMask & ~negative[index] & ~keep
+                        if extra:
+                            if trace is not None:
+                                self.traceEvent(RULE_HIDDEN_SUBSET, index, list(maskNumbers(extra)))
+                            if stats is not None:
+                                stats.fire(RULE_HIDDEN_SUBSET, popcount(extra))
+                            self.eliminate(index, extra, worklist)
+                            found = True
+                    if found:
+                        break
+                if found:
+                    break
+            if found:
+                break
+        if stats is not None:
+            stats.lap(RULE_HIDDEN_SUBSET, t)
+        return found
+
+    # Solver #6: Fish (X-Wing for 2 lines, Swordfish for 3 lines)
+    # When a number is positive in k rows only within the same k columns,
+    # the other rows have the number negative in the k columns, and the
+    # same holds with rows and columns exchanged.
+    # return True when a negative set is changed
+    def fish(self, worklist):
+        status = self.status
+        negative = self.f_negative
+        length = self.length
+        trace = self.trace
+        stats = self.stats
+        if stats is not None:
+            t = perf_counter()
+            stats.visits[RULE_FISH] += 2 * length
+        found = False
+        for n in range(1, length + 1):
+            bit = 1 << (n - 1)
+            # (line, cross) to a Square index for base rows and base columns
+            for (lineStep, crossStep) in ((length, 1), (1, length)):
+                lineList = list()
+                for line in range(length):
+                    mask = 0
+                    for cross in range(length):
+                        index = line * lineStep + cross * crossStep
+                        if status[index] == FREE and not negative[index] & bit:
+                            mask |= 1 << cross
+                    if 2 <= popcount(mask) <= FISH_SIZE:
+                        lineList.append((line, mask))
+                for k in range(2, FISH_SIZE + 1):
+                    for subset in combinations(lineList, k):
+                        crossMask = 0
+                        for (line, mask) in subset:
+                            crossMask |= mask
+                        if popcount(crossMask) != k:
+                            continue
+                        baseSet = {line for (line, mask) in subset}
+                        for cross in maskNumbers(crossMask):
+                            for line in range(length):
+                                index = line * lineStep + (cross - 1) * crossStep
+                                if line not in baseSet and status[index] == FREE and not negative[index] & bit:
+                                    if trace is not None:
+                                        self.traceEvent(RULE_FISH, index, [n])
+                                    if stats is not None:
+                                        stats.fire(RULE_FISH, 1)
+                                    self.eliminate(index, bit, worklist)
+                                    found = True
+                        if found:
+                            break
+                    if found:
+                        break
+                if found:
+                    break
+            if found:
+                break
+        if stats is not None:
+            stats.lap(RULE_FISH, t)
+        return found
+
+    # Assume a number at a free Square and propagate from the change only
+    # The board must be at a fixpoint of solve(), assume() or undo().
+    # The worklist runs the rules of the propagation strategy used by solve().
+    def assume(self, index, n, propagation="queue"):
+        worklist = Worklist(self, *PROPAGATION_WORKLIST[propagation])
+        self.place(index, n, worklist)
+        if not self.propagate(worklist):
+            return "CONFLICTED"
+        return self.checkStatus()
+
+    # Undo changes on the trail back to a length taken before assume()
+    def undo(self, mark):
+        negative = self.f_negative
+        status = self.status
+        number = self.number
+        trail = self.trail
+        branching = self.branching
+        while len(trail) > mark:
+            (index, oldNegative, oldStatus) = trail.pop()
+            if branching is not None:
+                branching.update(index, negative[index], oldNegative)
+            negative[index] = oldNegative
+            if oldStatus == FREE:
+                status[index] = FREE
+                number[index] = 0
+
+    # Check the status of this board
+    def checkStatus(self):
+        status = self.status
+        negative = self.f_negative
+        fullMask = self.fullMask
+        result = "SOLVED"
+        for index in range(self.size):
+            if status[index] == FREE:
+                if negative[index] == fullMask:
+                    # No possible solution for the Square
+                    return "CONFLICTED"
+                else:
+                    # Found a unresolved Square
+                    result = "UNRESOLVED"
+        return result
+
+# Propagation strategies
+# "sweep": full passes of Solver #1, #2 and #3 as Board.solve()
+# "cheap": full passes of Solver #1 and #2 to a fixpoint before each pass of Solver #3
+# "singles": full passes of Solver #1 and #2 only
+# "queue": worklist of Solver #1, #2 and #3, cheap rules first
+# "queue-singles": worklist of Solver #1 and #2 only
+# "advanced": worklist of Solver #1, #2 and #3, naked and hidden subsets,
+# X-Wing and Swordfish
+PROPAGATION = {
+    "sweep": BitBoard.sweep,
+    "cheap": BitBoard.sweepCheapFirst,
+    "singles": BitBoard.sweepSingles,
+    "queue": BitBoard.propagate,
+    "queue-singles": BitBoard.propagateSingles,
+    "advanced": BitBoard.propagateAll
+}
+
+# Worklist arguments (clusters, advanced) of the rules of a strategy
+# assume() follows with a worklist of the same rules, since full passes are not undoable.
+PROPAGATION_WORKLIST = {
+    "sweep": (True, False),
+    "cheap": (True, False),
+    "singles": (False, False),
+    "queue": (True, False),
+    "queue-singles": (False, False),
+    "advanced": (True, True)
+}
+
+# Kind of work in the Worklist
+WORK_NONE = 0
+WORK_SQUARE = 1
+WORK_GROUP = 2
+WORK_CLUSTER = 3
+
+# Rule applied to each kind of work
+WORK_RULE = (None, RULE_LAST_POSITIVE, RULE_LAST_IN_GROUP, RULE_INDIRECT_CLUSTER)
+
+# Worklist of Squares, Groups and Clusters to be revisited by the rules
+# Cheap rules are served first: Squares, then Groups, then Clusters.
+class Worklist:
+    __slots__ = (
+        "board", "squareQueue", "groupQueue", "clusterQueue",
+        "squarePending", "groupPending", "clusterPending", "advanced"
+    )
+
+    # constructor
+    # Clusters are never queued when clusters is false, Solver #3 is skipped then.
+    # The subset and fish rules run at each fixpoint when advanced is true.
+    def __init__(self, board, clusters=True, advanced=False):
+        self.board = board
+        self.squareQueue = deque()
+        self.groupQueue = deque()
+        self.clusterQueue = deque()
+        self.squarePending = [False] * board.size
+        self.groupPending = [False] * len(board.groupSquares)
+        # A Cluster marked pending is never queued again
+        self.clusterPending = [not clusters] * len(board.clusterSquares)
+        self.advanced = advanced
+
+    # Queue everything on the board
+    def pushAll(self):
+        for index in range(self.board.size):
+            self.pushSquare(index)
+
+    # Queue a Square whose negative set has changed and what depends on it
+    def pushSquare(self, index):
+        board = self.board
+        if not self.squarePending[index]:
+            self.squarePending[index] = True
+            self.squareQueue.append(index)
+        for group in board.squareGroups[index]:
+            if not self.groupPending[group]:
+                self.groupPending[group] = True
+                self.groupQueue.append(group)
+        for cluster in board.squareNeighborClusters[index]:
+            if not self.clusterPending[cluster]:
+                self.clusterPending[cluster] = True
+                self.clusterQueue.append(cluster)
+
+    # return (kind, key) of the next work
+    def pop(self):
+        if self.squareQueue:
+            index = self.squareQueue.popleft()
+            self.squarePending[index] = False
+            return (WORK_SQUARE, index)
+        if self.groupQueue:
+            group = self.groupQueue.popleft()
+            self.groupPending[group] = False
+            return (WORK_GROUP, group)
+        if self.clusterQueue:
+            cluster = self.clusterQueue.popleft()
+            self.clusterPending[cluster] = False
+            return (WORK_CLUSTER, cluster)
+        return (WORK_NONE, None)
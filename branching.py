@@ -0,0 +1,85 @@
+# Branching heuristics of the search on a BitBoard
+# A Branching keeps every Square of a board in a bucket by the size of its
+# negative set. A Square with the longest negative is found from the
+# fullest non-empty bucket without scanning the board, then tie-break and
+# value-order heuristics decide the Square and the order of its numbers.
+# Non-free Squares have a full negative set, so they are never chosen.
+
+from bitboard import FREE, maskNumbers, popcount
+
+# Names of the heuristics
+# tie-break "first": the Square entering the bucket first
+#           "group": the Square in the Group with fewest free Squares
+#           "degree": the Square with most free peers
+# value order "ascending": numbers in ascending order
+#             "lcv": least constraining value, the number positive in fewest free peers first
+TIE_BREAK = ("first", "group", "degree")
+VALUE_ORDER = ("ascending", "lcv")
+
+# branching class
+class Branching:
+    __slots__ = ("tieBreak", "valueOrder", "bucketList")
+
+    # constructor
+    def __init__(self, tieBreak="first", valueOrder="ascending"):
+        if tieBreak not in TIE_BREAK:
+            raise ValueError("unknown tie-break %r" % tieBreak)
+        if valueOrder not in VALUE_ORDER:
+            raise ValueError("unknown value order %r" % valueOrder)
+        self.tieBreak = tieBreak
+        self.valueOrder = valueOrder
+        # bucketList[nNegative] holds the Squares with nNegative numbers in
+        # their negative set, as dict keys in the order they entered
+        self.bucketList = list()
+
+    # Put all Squares of a board in their buckets
+    def rebuild(self, board):
+        negative = board.f_negative
+        self.bucketList = [dict() for i in range(board.length + 1)]
+        for index in range(board.size):
+            self.bucketList[popcount(negative[index])][index] = None
+
+    # Move a Square whose negative set changes
+    def update(self, index, oldNegative, newNegative):
+        old = popcount(oldNegative)
+        new = popcount(newNegative)
+        if old != new:
+            del self.bucketList[old][index]
+            self.bucketList[new][index] = None
+
+    # Find a free Square with longest negative, None when no Square is free
+    def findFreeSquare(self, board):
+        for nNegative in range(board.length - 1, -1, -1):
+            bucket = self.bucketList[nNegative]
+            if bucket:
+                if self.tieBreak == "first":
+                    return next(iter(bucket))
+                if self.tieBreak == "group":
+                    return min(bucket, key=lambda index: self.groupFree(board, index))
+                return max(bucket, key=lambda index: self.freePeers(board, index))
+        return None
+
+    # a list of numbers still possible at a Square in the value order
+    def choiceList(self, board, index):
+        choiceList = list(maskNumbers(board.positive(index)))
+        if self.valueOrder == "lcv":
+            negative = board.f_negative
+            status = board.status
+            peerList = [peer for peer in board.peers[index] if status[peer] == FREE]
+            choiceList.sort(key=lambda n: sum(
+                1 for peer in peerList if not negative[peer] & (1 << (n - 1))
+            ))
+        return choiceList
+
+    # the number of free Squares in the Group of a Square having fewest
+    def groupFree(self, board, index):
+        status = board.status
+        return min(
+            sum(1 for square in board.groupSquares[group] if status[square] == FREE)
+            for group in board.squareGroups[index]
+        )
+
+    # the number of free peers of a Square
+    def freePeers(self, board, index):
+        status = board.status
+        return sum(1 for peer in board.peers[index] if status[peer] == FREE)
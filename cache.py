@@ -0,0 +1,132 @@
+# Bounded LRU cache of solved puzzles
+# Keys are canonical puzzles, so equivalent puzzles share an entry.
+# The cache can be saved to and loaded from a JSON file. Keys and values
+# are tuples of None, booleans, numbers, strings and bytes, tuples are
+# written as lists and bytes as {"bytes": hex} objects.
+# A key is (engine, propagation, vector, limit, canonical key) and a value
+# is (status, grid or None, number of solutions, exhausted), as made by
+# BatchSolver.
+
+import json
+import os
+import sys
+from collections import OrderedDict
+
+# Version of the cache file format
+CACHE_VERSION = 1
+
+# Convert a key or value to JSON data
+def encodeItem(item):
+    if isinstance(item, tuple):
+        return [encodeItem(element) for element in item]
+    if isinstance(item, bytes):
+        return {"bytes": item.hex()}
+    return item
+
+# Convert JSON data back to a key or value
+def decodeItem(data):
+    if isinstance(data, list):
+        return tuple(decodeItem(element) for element in data)
+    if isinstance(data, dict):
+        if set(data) != {"bytes"} or not isinstance(data["bytes"], str):
+            raise ValueError("unknown object %r" % data)
+        return bytes.fromhex(data["bytes"])
+    return data
+
+# true if a value is an instance of a type, bool is not taken as an int
+def isType(value, types):
+    if isinstance(value, bool) and bool not in types:
+        return False
+    return isinstance(value, types)
+
+# Types of each item of a key and of a value
+KEY_TYPES = ((str,), (str,), (bool,), (int, type(None)), (bytes,))
+VALUE_TYPES = ((str,), (bytes, type(None)), (int,), (bool,))
+
+# Check the shape of a loaded entry, raise ValueError when it is not a
+# key and a value of a solution
+def checkEntry(key, value):
+    for (name, item, typesList) in (("key", key, KEY_TYPES), ("value", value, VALUE_TYPES)):
+        if not isinstance(item, tuple) or len(item) != len(typesList):
+            raise ValueError("%s %r is not a tuple of %d items" % (name, item, len(typesList)))
+        for (element, types) in zip(item, typesList):
+            if not isType(element, types):
+                raise ValueError("%s %r has an item of type %s" % (name, item, type(element).__name__))
+
+# solution cache class
+class SolutionCache:
+    # constructor, maxSize is the largest number of entries kept
+    def __init__(self, maxSize=100000):
+        if maxSize < 1:
+            raise ValueError("cache size must be positive")
+        self.maxSize = maxSize
+        self.entryDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entryDict)
+
+    # return the value of a key, None when the key is missing
+    def get(self, key):
+        value = self.entryDict.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entryDict.move_to_end(key)
+        self.hits += 1
+        return value
+
+    # Store the value of a key, dropping the least recently used entries
+    def put(self, key, value):
+        self.entryDict[key] = value
+        self.entryDict.move_to_end(key)
+        while len(self.entryDict) > self.maxSize:
+            self.entryDict.popitem(last=False)
+
+    # Load entries saved by save(), a missing file leaves the cache empty
+    # A file that is not a cache file raises ValueError.
+    def load(self, fileName):
+        if not os.path.exists(fileName):
+            return
+        try:
+            with open(fileName) as stream:
+                data = json.load(stream)
+            if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+                raise ValueError("unsupported version")
+            entryList = [(decodeItem(key), decodeItem(value)) for (key, value) in data["entries"]]
+            for (key, value) in entryList:
+                checkEntry(key, value)
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError("%s is not a solution cache file: %s" % (fileName, e))
+        for (key, value) in entryList:
+            self.put(key, value)
+
+    # Save entries from the least recently used one
+    def save(self, fileName):
+        with open(fileName, "w") as stream:
+            json.dump({
+                "version": CACHE_VERSION,
+                "entries": [[encodeItem(key), encodeItem(value)] for (key, value) in self.entryDict.items()]
+            }, stream)
+
+    # ratio of lookups answered by the cache
+    def hitRate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    # Approximate bytes held by the entries
+    def memory(self):
+        total = sys.getsizeof(self.entryDict)
+        for (key, value) in self.entryDict.items():
+            total += sys.getsizeof(key) + sys.getsizeof(value)
+            for item in key + value:
+                total += sys.getsizeof(item)
+        return total
+
+    # return a summary of the cache as a line
+    def summary(self):
+        return "cache %d/%d entries, %d hits, %d misses, hit rate %.1f%%, %.1f KiB" % (
+            len(self.entryDict), self.maxSize, self.hits, self.misses,
+            self.hitRate() * 100, self.memory() / 1024
+        )
@@ -0,0 +1,182 @@
+# Canonical form of puzzles under the symmetries of the board
+# Puzzles equivalent under number relabeling, transposition, permutation
+# of bands and stacks and permutation of rows and columns within them get
+# the same key in most cases. The key is always the puzzle itself seen
+# through one of these symmetries, so a solution found for a key maps back
+# to a solution of every puzzle having the key.
+#
+# Rows and columns are ordered by signatures refined from the givens that
+# do not depend on the symmetries. Lines having the same signature are
+# tried in every order up to ORDER_LIMIT orders, then the smallest
+# relabeled puzzle is the key. Beyond the limit one order is taken, which
+# keeps the key valid but may miss an equivalent puzzle.
+
+from itertools import permutations, product
+from math import factorial
+
+from engine import BLANK
+from puzzlefile import lineUnit
+
+# Largest number of row and column orders tried for lines of equal signature
+ORDER_LIMIT = 24
+# Rounds refining row signatures by column signatures and back
+REFINE_ROUNDS = 2
+
+# canonical form class
+class CanonicalForm:
+    __slots__ = ("key", "length", "transpose", "rowOrder", "colOrder", "label", "number")
+
+    # constructor
+    # label maps a number of the puzzle to the number of the key, number
+    # maps back, both indexed by number with 0 for a blank Square
+    def __init__(self, key, length, transpose, rowOrder, colOrder, label):
+        self.key = key
+        self.length = length
+        self.transpose = transpose
+        self.rowOrder = rowOrder
+        self.colOrder = colOrder
+        # Numbers absent from the puzzle take the labels left in ascending order
+        label = list(label)
+        unused = [n for n in range(1, length + 1) if n not in label]
+        for n in range(1, length + 1):
+            if not label[n]:
+                label[n] = unused.pop(0)
+        self.label = label
+        self.number = [0] * (length + 1)
+        for n in range(1, length + 1):
+            self.number[label[n]] = n
+
+    # Serial index in the puzzle of a Square of the key
+    def index(self, row, col):
+        (r, c) = (self.rowOrder[row], self.colOrder[col])
+        if self.transpose:
+            return c * self.length + r
+        return r * self.length + c
+
+    # Map a grid of the puzzle to the grid of the key, as bytes
+    def toCanonical(self, grid):
+        length = self.length
+        return bytes(
+            self.label[grid[self.index(row, col)]]
+            for row in range(length)
+            for col in range(length)
+        )
+
+    # Map a grid of the key back to the grid of the puzzle, as bytes
+    def fromCanonical(self, grid):
+        length = self.length
+        result = bytearray(length * length)
+        for row in range(length):
+            for col in range(length):
+                result[self.index(row, col)] = self.number[grid[row * length + col]]
+        return bytes(result)
+
+# Rank values as small integers in sorted order
+def rank(valueList):
+    order = {value: i for (i, value) in enumerate(sorted(set(valueList)))}
+    return [order[value] for value in valueList]
+
+# Signatures of rows and columns of a grid of numbers and 0 for blank
+def lineSignatures(grid, length):
+    # Frequency of each number among the givens does not depend on relabeling
+    frequency = [0] * (length + 1)
+    for number in grid:
+        frequency[number] += 1
+    cellList = [
+        (row, col, frequency[grid[row * length + col]])
+        for row in range(length)
+        for col in range(length)
+        if grid[row * length + col]
+    ]
+    rowValues = [list() for i in range(length)]
+    colValues = [list() for i in range(length)]
+    for (row, col, f) in cellList:
+        rowValues[row].append(f)
+        colValues[col].append(f)
+    rowSig = rank([tuple(sorted(values)) for values in rowValues])
+    colSig = rank([tuple(sorted(values)) for values in colValues])
+    for i in range(REFINE_ROUNDS):
+        rowValues = [list() for line in range(length)]
+        colValues = [list() for line in range(length)]
+        for (row, col, f) in cellList:
+            rowValues[row].append((f, colSig[col]))
+            colValues[col].append((f, rowSig[row]))
+        (rowSig, colSig) = (
+            rank([(rowSig[row], tuple(sorted(rowValues[row]))) for row in range(length)]),
+            rank([(colSig[col], tuple(sorted(colValues[col]))) for col in range(length)])
+        )
+    return (rowSig, colSig)
+
+# Orders of values with equal keys: every order of each run of equal keys,
+# or only the sorted order when there are more than ORDER_LIMIT
+def tieOrders(valueList, key):
+    valueList = sorted(valueList, key=key)
+    runList = list()
+    for value in valueList:
+        if runList and key(runList[-1][0]) == key(value):
+            runList[-1].append(value)
+        else:
+            runList.append([value])
+    count = 1
+    for run in runList:
+        count *= factorial(len(run))
+    if count > ORDER_LIMIT:
+        return [valueList]
+    return [
+        [value for run in runs for value in run]
+        for runs in product(*[list(permutations(run)) for run in runList])
+    ]
+
+# Orders of the lines of a board keeping bands (or stacks) together
+def lineOrders(signature, unit):
+    bandList = [list(range(band * unit, band * unit + unit)) for band in range(unit)]
+    # Lines of each band in signature order with the ties
+    bandOrders = [tieOrders(lines, lambda line: signature[line]) for lines in bandList]
+    bandSig = [tuple(sorted(signature[line] for line in lines)) for lines in bandList]
+    orderList = list()
+    for bands in tieOrders(range(unit), lambda band: bandSig[band]):
+        for lineOrders in product(*[bandOrders[band] for band in bands]):
+            orderList.append([line for lines in lineOrders for line in lines])
+            if len(orderList) >= ORDER_LIMIT:
+                return orderList
+    return orderList
+
+# Relabel numbers of a grid in the order of first appearance
+# return (key, label)
+def relabel(grid, length, rowOrder, colOrder):
+    label = [0] * (length + 1)
+    nextLabel = 1
+    key = bytearray()
+    for r in rowOrder:
+        base = r * length
+        for c in colOrder:
+            number = grid[base + c]
+            if number and not label[number]:
+                label[number] = nextLabel
+                nextLabel = nextLabel + 1
+            key.append(label[number])
+    return (bytes(key), label)
+
+# return the CanonicalForm of a puzzle given as a serial list, BLANK for a free Square
+def canonicalForm(q):
+    unit = lineUnit(len(q))
+    if unit is None:
+        raise ValueError("puzzle length %d is not a square board" % len(q))
+    length = unit * unit
+    grid = [0 if number == BLANK else number for number in q]
+    best = None
+    for transpose in (False, True):
+        if transpose:
+            grid = [grid[col * length + row] for row in range(length) for col in range(length)]
+        (rowSig, colSig) = lineSignatures(grid, length)
+        rowOrderList = lineOrders(rowSig, unit)
+        colOrderList = lineOrders(colSig, unit)
+        # Rows and columns share ORDER_LIMIT
+        del colOrderList[max(1, ORDER_LIMIT // len(rowOrderList)):]
+        for rowOrder in rowOrderList:
+            for colOrder in colOrderList:
+                (key, label) = relabel(grid, length, rowOrder, colOrder)
+                if best is None or key < best[0]:
+                    best = (key, transpose, rowOrder, colOrder, label)
+    (key, transpose, rowOrder, colOrder, label) = best
+    return CanonicalForm(key, length, transpose, rowOrder, colOrder, label)
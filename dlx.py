@@ -0,0 +1,255 @@
+# Exact cover search with Dancing Links (Algorithm X)
+# Every free Square with a number is a row covering four columns:
+# the Square, the number in the row, in the column and in the box.
+# Results have the same forms as Search: Solution.snapshot() lists of
+# every free Square and bytes of the numbers of all Squares.
+
+from bitboard import FREE
+from search import SEARCH_LIMIT, collectSolutions, countSolutions, countStats
+
+# dancing links class
+class DancingLinks:
+    __slots__ = (
+        "board", "solutionList", "gridList", "exhausted", "nodes", "found", "stopped",
+        "left", "right", "up", "down", "column", "columnSize", "rowSquare", "rowNumber"
+    )
+
+    # constructor
+    def __init__(self, board):
+        self.board = board
+        self.solutionList = list()
+        self.gridList = list()
+        # True when the search has scanned all branches
+        self.exhausted = False
+        # Number of rows tried by the search
+        self.nodes = 0
+        # Number of solutions found by the search
+        self.found = 0
+        # True when stop() is called
+        self.stopped = False
+
+    # Append a node to the list of nodes, return its index
+    def appendNode(self, column):
+        node = len(self.left)
+        self.left.append(node)
+        self.right.append(node)
+        self.up.append(self.up[column])
+        self.down.append(column)
+        self.down[self.up[column]] = node
+        self.up[column] = node
+        self.column.append(column)
+        self.columnSize[column] += 1
+        self.rowSquare.append(-1)
+        self.rowNumber.append(0)
+        return node
+
+    # Build the exact cover matrix of free Squares, return False when givens conflict
+    def build(self):
+        board = self.board
+        unit = board.unit
+        length = board.length
+        size = board.size
+        # Column of a constraint: Square, row, column and box numbers
+        nColumn = 4 * size
+        # Node 0 is the root, node c + 1 is the header of column c
+        self.left = [i - 1 for i in range(nColumn + 1)]
+        self.right = [i + 1 for i in range(nColumn + 1)]
+        self.left[0] = nColumn
+        self.right[nColumn] = 0
+        self.up = list(range(nColumn + 1))
+        self.down = list(range(nColumn + 1))
+        self.column = list(range(nColumn + 1))
+        self.columnSize = [0] * (nColumn + 1)
+        self.rowSquare = [-1] * (nColumn + 1)
+        self.rowNumber = [0] * (nColumn + 1)
+        # Cover constraints satisfied by the givens
+        used = [False] * nColumn
+        constraintList = list()
+        for index in range(size):
+            (row, col) = divmod(index, length)
+            box = (row // unit) * unit + col // unit
+            constraintList.append((
+                index,
+                size + row * length,
+                2 * size + col * length,
+                3 * size + box * length
+            ))
+        for index in range(size):
+            if board.status[index] != FREE:
+                n = board.number[index] - 1
+                (square, row, col, box) = constraintList[index]
+                for c in (square, row + n, col + n, box + n):
+                    if used[c]:
+                        return False
+                    used[c] = True
+        for c in range(nColumn):
+            if used[c]:
+                header = c + 1
+                self.right[self.left[header]] = self.right[header]
+                self.left[self.right[header]] = self.left[header]
+        # Rows of free Squares and numbers allowed by the givens
+        for index in range(size):
+            if board.status[index] != FREE:
+                continue
+            (square, row, col, box) = constraintList[index]
+            for n in range(length):
+                constraints = (square, row + n, col + n, box + n)
+                if any(used[c] for c in constraints):
+                    continue
+                first = None
+                for c in constraints:
+                    node = self.appendNode(c + 1)
+                    self.rowSquare[node] = index
+                    self.rowNumber[node] = n + 1
+                    if first is None:
+                        first = node
+                    else:
+                        self.left[node] = self.left[first]
+                        self.right[node] = first
+                        self.right[self.left[first]] = node
+                        self.left[first] = node
+        return True
+
+    # Remove a column and the rows covering it
+    def cover(self, c):
+        left = self.left
+        right = self.right
+        up = self.up
+        down = self.down
+        column = self.column
+        count = self.columnSize
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                count[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    # Restore a column removed by cover()
+    def uncover(self, c):
+        left = self.left
+        right = self.right
+        up = self.up
+        down = self.down
+        column = self.column
+        count = self.columnSize
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                count[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    # Cover the other columns of a row
+    def coverRow(self, r):
+        j = self.right[r]
+        while j != r:
+            self.cover(self.column[j])
+            j = self.right[j]
+
+    # Uncover the other columns of a row in reverse order
+    def uncoverRow(self, r):
+        j = self.left[r]
+        while j != r:
+            self.uncover(self.column[j])
+            j = self.left[j]
+
+    # return the rows of a complete cover as (Solution.snapshot(), bytes of the numbers)
+    def record(self, rowList):
+        board = self.board
+        number = list(board.number)
+        for r in rowList:
+            number[self.rowSquare[r]] = self.rowNumber[r]
+        return (
+            sorted((board.location(self.rowSquare[r]), self.rowNumber[r]) for r in rowList),
+            bytes(number)
+        )
+
+    # Count solutions up to limit without keeping them
+    def count(self, limit=None):
+        return countSolutions(self.solutions(), limit)
+
+    # true if the board has exactly one solution
+    def isUnique(self):
+        return self.count(SEARCH_LIMIT["unique"]) == 1
+
+    # Stop the search at the next row, may be called from another thread
+    def stop(self):
+        self.stopped = True
+
+    # Search solutions, return a list of Solution.snapshot()
+    # The search stops as soon as limit solutions are found, unless limit is None.
+    # Rows tried and solutions are counted in the stats of the board when it has one.
+    def run(self, limit=None):
+        return collectSolutions(self, self.solutions(), limit)
+
+    # Search solutions lazily, yield (Solution.snapshot(), bytes of the numbers
+    # of all Squares) as soon as each one is found, see Search.solutions()
+    def solutions(self):
+        self.exhausted = False
+        self.nodes = 0
+        self.found = 0
+        backtracks = 0
+        try:
+            if not self.build():
+                self.exhausted = True
+                return
+            right = self.right
+            down = self.down
+            count = self.columnSize
+            column = self.column
+            rowList = list()
+            while not self.stopped:
+                descend = False
+                if right[0] == 0:
+                    # All constraints are covered
+                    self.found += 1
+                    yield self.record(rowList)
+                else:
+                    # Choose the column with the fewest rows
+                    c = right[0]
+                    best = c
+                    while c != 0:
+                        if count[c] < count[best]:
+                            best = c
+                        c = right[c]
+                    self.cover(best)
+                    r = down[best]
+                    if r != best:
+                        self.nodes += 1
+                        rowList.append(r)
+                        self.coverRow(r)
+                        descend = True
+                    else:
+                        self.uncover(best)
+                if descend:
+                    continue
+                # Back to the last row having a sibling
+                while rowList:
+                    backtracks += 1
+                    r = rowList.pop()
+                    self.uncoverRow(r)
+                    c = column[r]
+                    r = down[r]
+                    if r != c:
+                        self.nodes += 1
+                        rowList.append(r)
+                        self.coverRow(r)
+                        break
+                    self.uncover(c)
+                else:
+                    self.exhausted = True
+                    break
+        finally:
+            # Branch points are not counted by Dancing Links
+            countStats(self, 0, backtracks)
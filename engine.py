@@ -0,0 +1,576 @@
+# Sudoku solving engine
+# This module never imports tkinter so that it can be used on headless hosts.
+
+from tracing import (
+    TraceEvent, RULE_LAST_POSITIVE, RULE_LAST_IN_GROUP, RULE_NEGATE_BULK, RULE_NEGATE_LINEAR,
+    RULE_INDIRECT_CLUSTER
+)
+
+from time import perf_counter
+
+UNIT = 3
+
+# square class
+class Square:
+    __slots__ = ("board", "col", "row", "hcluster", "vcluster", "status", "number", "f_negative")
+
+    # constructor
+    def __init__(self, board, col, row):
+        self.board = board
+        self.col = col
+        self.row = row
+        self.hcluster = None
+        self.vcluster = None
+        self.unassign()
+        self.resetNegative()
+    
+    # Assign a number to the Square
+    def assign(self, number, status="assigned"):
+        assert(number in self.board.numberSet)
+        self.number = number
+        self.status = status
+        self.touch()
+
+    # Unassign number of the Square
+    def unassign(self):
+        self.status = "free"
+        self.number = None
+        self.touch()
+
+    # Reset negative set
+    def resetNegative(self):
+        self.f_negative = set()
+        self.touch()
+    
+    def addNegative(self, number):
+        self.f_negative.add(number)
+        self.touch()
+
+    # Add numbers to the negative set
+    def updateNegative(self, numbers):
+        self.f_negative.update(numbers)
+        self.touch()
+
+    def negative(self):
+        return self.f_negative
+    
+    # Set all negative flags
+    def negateAll(self):
+        self.f_negative.update(self.board.numberSet)
+        self.touch()
+
+    # Mark the Square changed for a redraw
+    def touch(self):
+        dirty = self.board.dirty
+        if dirty is not None:
+            dirty.add(self)
+
+    # add negative flag in groups
+    def negateGroup(self):
+        self.negateAll()
+        for cluster in [self.hcluster, self.vcluster]:
+            for group in cluster.groupList():
+                group.addNegative(self.number)
+
+# cluster class
+class Cluster:
+    __slots__ = ("board", "f_squareList", "linearGroup", "bulkGroup")
+
+    #constructor
+    def __init__(self, board):
+        self.board = board
+        self.f_squareList = list()
+        self.linearGroup = None
+        self.bulkGroup = None
+
+    # append a Square to this Cluster
+    def append(self, square):
+        self.f_squareList.append(square)
+
+    # a set of elements never contained in this Cluster
+    def negative(self):
+        negSet = set(self.board.numberSet)
+        for square in self.squareList():
+            negSet &= square.negative()
+        return negSet
+    
+    # add a number to the negative of cluster member
+    def addNegative(self, number):
+        for square in self.squareList():
+            square.addNegative(number)
+    
+    # a list of Square in this Cluster
+    def squareList(self):
+        for square in self.f_squareList:
+            yield square
+    
+    def groupList(self):
+        yield self.linearGroup
+        yield self.bulkGroup
+
+class Group:
+    __slots__ = ("f_clusterList",)
+
+    #constructor
+    def __init__(self):
+        self.f_clusterList = list()
+
+    # append a Cluster to this Group    
+    def append(self, cluster):
+        self.f_clusterList.append(cluster)
+
+    # add a number to the negative of cluster member
+    def addNegative(self, number):
+        for cluster in self.clusterList():
+            cluster.addNegative(number)
+    
+    # the list of Cluster in this Group
+    def clusterList(self):
+        for cluster in self.f_clusterList:
+            yield cluster
+
+    # the list of Square in this Group
+    def squareList(self):
+        for cluster in self.clusterList():
+            for square in cluster.squareList():
+                yield square
+
+    # the list of "free" Square in this Group
+    def freeSquareList(self):
+        for cluster in self.clusterList():
+            for square in cluster.squareList():
+                if square.status == "free":
+                    yield square
+
+# board class
+class Board:
+    __slots__ = ("unit", "length", "f_squareList", "hClusterList", "vClusterList", "hGroupList", "vGroupList", "numberSet", "trace", "stats", "dirty")
+
+    # constructor
+    def __init__(self, unit):
+        self.unit = unit
+        # define board length
+        self.length = unit * unit
+        # Set of Squares changed since the last redraw, None when no view
+        # follows the board
+        self.dirty = None
+        # Fill Square on board
+        self.f_squareList = list()
+        for row in range(self.length):
+            for col in range(self.length):
+                self.f_squareList.append(Square(self, col, row))
+        # Construct horizontal cluster
+        self.hClusterList = list()
+        for row in range(self.length):
+            for cbase in range(0, self.length, self.unit):
+                cluster = Cluster(self)
+                for col in range(cbase, cbase + self.unit):
+                    cluster.append(self.square(col, row))
+                self.hClusterList.append(cluster)
+                for square in cluster.squareList():
+                    square.hcluster = cluster
+        # Construct vertial cluster
+        self.vClusterList = list()
+        for col in range(self.length):
+            for rbase in range(0, self.length, self.unit):
+                cluster = Cluster(self)
+                for row in range(rbase, rbase + self.unit):
+                    cluster.append(self.square(col, row))
+                self.vClusterList.append(cluster)
+                for square in cluster.squareList():
+                    square.vcluster = cluster
+        # Construct groupList
+        self.hGroupList = list()
+        for row in range(self.length):
+            group = Group()
+            for col in range(self.unit):
+                group.append(self.hClusterList[row * self.unit + col])
+            self.hGroupList.append(group)
+            for cluster in group.clusterList():
+                cluster.linearGroup = group
+        for rbase in range(0, self.length, self.unit):
+            for col in range(self.unit):
+                group = Group()
+                for row in range(rbase, rbase + self.unit):
+                    group.append(self.hClusterList[row * self.unit + col])
+                self.hGroupList.append(group)
+                for cluster in group.clusterList():
+                    cluster.bulkGroup = group
+        self.vGroupList = list()
+        for col in range(self.length):
+            group = Group()
+            for row in range(self.unit):
+                group.append(self.vClusterList[col * self.unit + row])
+            self.vGroupList.append(group)
+            for cluster in group.clusterList():
+                cluster.linearGroup = group
+        for cbase in range(0, self.length, self.unit):
+            for row in range(self.unit):
+                group = Group()
+                for col in range(cbase, cbase + self.unit):
+                    group.append(self.vClusterList[col * self.unit + row])
+                self.vGroupList.append(group)
+                for cluster in group.clusterList():
+                    cluster.bulkGroup = group
+        # Define a set of all number to se put
+        self.numberSet =frozenset({i+1 for i in range(self.length)})
+        # Sink of solver events, None for no trace
+        self.trace = None
+        # SolverStats counting the work of the rules, None for no profiling
+        self.stats = None
+
+    # Fix numbers given as a serial list, BLANK for a free Square
+    def load(self, q):
+        for i in range(len(q)):
+            if q[i] != BLANK:
+                row = int(i / self.length)
+                col = i % self.length
+                self.square(col, row).assign(q[i], "fixed")
+
+    # return a Square on the board
+    def square(self, col, row):
+        return self.f_squareList[row*self.length+col]
+
+    def squareAt(self, pivot):
+        return self.square(pivot.col(), pivot.row())
+
+    # return a serial list of Square
+    def squareList(self):
+        for square in self.f_squareList:
+            yield square
+
+    # return a serial list of "free" Square
+    def freeSquareList(self):
+        for square in self.f_squareList:
+            if square.status == "free":
+                yield square
+
+    # return combined Group list
+    def groupList(self):
+        for group in self.hGroupList:
+            yield group
+        for group in self.vGroupList:
+            yield group
+
+    # return combined Cluster list
+    def clusterList(self):
+        for cluster in self.hClusterList:
+            yield cluster
+        for cluster in self.vClusterList:
+            yield cluster
+
+    def resetNegative(self):
+        for square in self.squareList():
+            square.resetNegative()
+
+    # Unassign all "assigned" Square
+    def unassign(self):
+        for square in self.squareList():
+            if square.status == "assigned":
+                square.unassign()
+
+    # return the location of a Square
+    def location(self, square):
+        return (square.col, square.row)
+
+    # a list of numbers still possible at a Square
+    def choiceList(self, square):
+        return list(set(self.numberSet) - square.negative())
+
+    # Find a free Square with longest negative
+    def findFreeSquare(self):
+        found = None
+        nNegative = -1
+        for square in self.squareList():
+            if square.status == "free":
+                if len(square.negative()) > nNegative:
+                    found = square
+                    nNegative = len(square.negative())
+        return found
+
+    # the number of candidates removed by assigning a number to a free Square
+    def placeEliminations(self, square, number):
+        peerSet = set()
+        for cluster in [square.hcluster, square.vcluster]:
+            for group in cluster.groupList():
+                peerSet.update(group.squareList())
+        peerSet.discard(square)
+        count = self.length - len(square.negative()) - 1
+        for peer in peerSet:
+            if not (number in peer.negative()):
+                count = count + 1
+        return count
+
+    # Solver function
+    def solve(self):
+        trace = self.trace
+        stats = self.stats
+        if stats is not None:
+            stats.propagations += 1
+            t = perf_counter()
+        # Clear all negative set
+        self.resetNegative()
+        # initialize negative set
+        for square in self.squareList():
+            if square.status == "fixed":
+                square.negateGroup()
+            elif square.status == "assigned":
+                square.negateGroup()
+        # Attempt solver algorithm as possible
+        solved = False  # Flag indicating solver completion
+        while not solved:
+            solved = True
+            # Soler #1: Last positive
+            # When the Negative set of a Square has all Numbers except one,
+            # the Square is assigned to the last positive Number not contained in the Negative set.
+            for square in self.freeSquareList():
+                nPositive = self.length - len(square.negative())
+                if nPositive == 0:
+                    if stats is not None:
+                        stats.lap(RULE_LAST_POSITIVE, t)
+                    return "CONFLICTED"
+                elif nPositive == 1:
+                    number = set(self.numberSet).difference(square.negative()).pop()
+                    if stats is not None:
+                        stats.fire(RULE_LAST_POSITIVE, self.placeEliminations(square, number))
+                    square.assign(number)
+                    if trace is not None:
+                        trace.emit(TraceEvent(RULE_LAST_POSITIVE, (square.col, square.row), [square.number]))
+                    square.negateGroup()
+                    solved = False
+            if stats is not None:
+                stats.passes += 1
+                stats.visits[RULE_LAST_POSITIVE] += len(self.f_squareList)
+                t = stats.lap(RULE_LAST_POSITIVE, t)
+            # Solver #2: Last positive in group
+            # When all Square in a Group has a Number in their Negative set except a Square,
+            # the Square not having the Number in its Negative set is assigned to the Number.
+            for number in self.numberSet:
+                for group in self.groupList():
+                    nPositive = 0
+                    for square in group.freeSquareList():
+                        if not (number in square.negative()):
+                            nPositive = nPositive + 1
+                    if nPositive == 1:
+                        for square in group.freeSquareList():
+                            if not (number in square.negative()):
+                                if stats is not None:
+                                    stats.fire(RULE_LAST_IN_GROUP, self.placeEliminations(square, number))
+                                square.assign(number)
+                                if trace is not None:
+                                    trace.emit(TraceEvent(RULE_LAST_IN_GROUP, (square.col, square.row), [square.number]))
+                                square.negateGroup()
+                                solved = False
+            if stats is not None:
+                stats.visits[RULE_LAST_IN_GROUP] += self.length * (len(self.hGroupList) + len(self.vGroupList))
+                t = stats.lap(RULE_LAST_IN_GROUP, t)
+            # Solver #3: Indirect negative cluster
+            # When all Cluster except one in a Group has a Number in their Negative set,
+            # other Cluster in the other Group of the last Cluster have the Number in their Negative set
+            for cluster in self.clusterList():
+                # Attempt to linear group
+                # Specify Numbers contained in Negative sets of other Clusters in a Group as negative.
+                negative = set(self.numberSet)
+                for otherCluster in cluster.linearGroup.clusterList():
+                    if otherCluster is not cluster:
+                        negative &= otherCluster.negative()
+                # Negate the positive Numbers in the other Cluster in another Group.
+                positive = negative - cluster.negative()
+                if len(positive) > 0:
+                    for otherCluster in cluster.bulkGroup.clusterList():
+                        if otherCluster is not cluster:
+                            for square in otherCluster.squareList():
+                                if len(positive - square.negative()) > 0:
+                                    if trace is not None:
+                                        trace.emit(TraceEvent(RULE_NEGATE_BULK, (square.col, square.row), sorted(positive)))
+                                    if stats is not None:
+                                        stats.fire(RULE_INDIRECT_CLUSTER, len(positive - square.negative()))
+                                    square.updateNegative(positive)
+                                    solved = False
+                # Attempt to bulk group
+                # Specify Numbers contained in Negative sets of other Clusters in a Group as negative.
+                negative = set(self.numberSet)
+                for otherCluster in cluster.bulkGroup.clusterList():
+                    if otherCluster is not cluster:
+                        negative &= otherCluster.negative()
+                # Negate the positive Numbers in the other Cluster in another Group.
+                positive = negative - cluster.negative()
+                if len(positive) > 0:
+                    for otherCluster in cluster.linearGroup.clusterList():
+                        if otherCluster is not cluster:
+                            for square in otherCluster.squareList():
+                                if len(positive - square.negative()) > 0:
+                                    if trace is not None:
+                                        trace.emit(TraceEvent(RULE_NEGATE_LINEAR, (square.col, square.row), sorted(positive)))
+                                    if stats is not None:
+                                        stats.fire(RULE_INDIRECT_CLUSTER, len(positive - square.negative()))
+                                    square.updateNegative(positive)
+                                    solved = False                            
+            if stats is not None:
+                stats.visits[RULE_INDIRECT_CLUSTER] += len(self.hClusterList) + len(self.vClusterList)
+                t = stats.lap(RULE_INDIRECT_CLUSTER, t)
+        # Check the status of this board
+        status = "SOLVED"
+        for square in self.squareList():
+            if square.status == "free":
+                if len(square.negative()) == self.length:
+                    # No possible solution for the Square
+                    return "CONFLICTED"
+                else:
+                    # Found a unresolved Square
+                    status = "UNRESOLVED"
+        return status
+
+# Example puzzles, x stands for a blank Square
+BLANK = -1
+x = BLANK
+Q1 = [
+    x,x,x,3,x,4,x,x,x,
+    x,x,x,x,7,x,9,x,x,
+    x,x,x,x,x,1,x,8,x,
+    1,x,x,x,x,x,4,x,7,
+    x,9,x,x,6,x,x,2,x,
+    4,x,5,x,x,x,x,x,6,
+    x,6,x,2,x,x,x,x,x,
+    x,x,7,x,4,x,x,x,x,
+    x,x,x,8,x,3,x,x,x
+]
+Q2 = [
+    x,x,6,x,x,x,5,x,x,
+    x,x,x,5,x,7,x,x,x,
+    2,x,x,x,x,x,x,x,8,
+    x,4,x,x,6,x,x,7,x,
+    x,x,3,8,x,5,6,x,x,
+    x,9,x,x,3,x,x,8,x,
+    1,x,x,x,x,x,x,x,2,
+    x,x,x,2,x,4,x,x,x,
+    x,x,4,x,x,x,1,x,x
+]
+Q98 = [
+    x,x,x,x,x,9,x,x,4,
+    x,x,x,x,1,x,x,3,x,
+    x,x,x,2,x,8,x,x,7,
+    3,x,2,x,x,x,6,x,x,
+    x,6,x,x,x,x,x,9,x,
+    x,x,4,x,x,x,1,x,8,
+    5,x,x,6,x,1,x,x,x,
+    x,4,x,x,5,x,x,x,x,
+    7,x,x,3,x,x,x,x,x
+]
+Q100 = [
+    x,3,x,x,5,x,x,6,x,
+    7,x,x,1,x,x,x,x,8,
+    x,x,2,x,x,x,x,x,x,
+    x,9,x,x,x,8,4,x,x,
+    x,4,x,x,x,x,x,1,x,
+    x,x,6,7,x,x,x,2,x,
+    x,x,x,x,x,x,3,x,x,
+    5,x,x,x,x,4,x,x,6,
+    x,6,x,x,9,x,x,5,x
+]
+Q130 = [
+    x,1,x,6,x,x,x,5,x,
+    7,2,x,x,x,x,x,x,9,
+    x,x,x,x,x,8,x,x,x,
+    3,x,x,x,1,x,6,x,x,
+    x,x,x,2,x,9,x,x,x,
+    x,x,5,x,4,x,x,x,8,
+    x,x,x,1,x,x,x,x,x,
+    5,x,x,x,x,x,x,3,2,
+    x,9,x,x,x,5,x,1,x
+]
+Qbaka = [
+    x,x,5,3,x,x,x,x,x,
+    x,x,x,x,x,x,x,x,x,
+    x,x,x,x,1,x,5,x,x,
+    4,x,x,x,x,5,3,x,x,
+    x,x,x,x,x,x,x,x,x,
+    x,x,3,2,x,x,x,8,x,
+    x,6,x,x,x,x,x,x,9,
+    x,x,x,x,x,x,x,x,x,
+    x,x,x,x,x,9,7,x,x
+]
+Qhard = [
+    x,x,5,3,x,x,x,x,x,
+    8,x,x,x,x,x,x,2,x,
+    x,7,x,x,1,x,5,x,x,
+    4,x,x,x,x,5,3,x,x,
+    x,1,x,x,7,x,x,x,6,
+    x,x,3,2,x,x,x,8,x,
+    x,6,x,5,x,x,x,x,9,
+    x,x,4,x,x,x,x,3,x,
+    x,x,x,x,x,9,7,x,x
+]
+del x
+EXAMPLES = {
+    "Q1": Q1,
+    "Q2": Q2,
+    "Q98": Q98,
+    "Q100": Q100,
+    "Q130": Q130,
+    "Qbaka": Qbaka,
+    "Qhard": Qhard
+}
+
+# Initialize with example board
+def exampleBoard(name="Qhard"):
+    board = Board(UNIT)
+    board.load(EXAMPLES[name])
+    return board
+
+# Solution class declaration
+class Solution:
+    __slots__ = ("board", "f_solutionStep")
+
+    # construct an instance with the first branch
+    def __init__(self, board):
+        self.board = board
+        self.f_solutionStep = list()
+        self.appendStep(board)
+
+    # Append a new step
+    def appendStep(self, board):
+        freeSquare = board.findFreeSquare()
+        self.f_solutionStep.append(
+            (freeSquare, board.choiceList(freeSquare))
+        )
+
+    # Prune the last step
+    def pruneStep(self):
+        self.f_solutionStep.pop(-1)
+
+    # Prune a leaf from the solution
+    def pruneLeaf(self):
+        while not self.isEmpty():
+            (square, choice) = self.lastStep()
+            # Prune first choice
+            choice.pop(0)
+            if len(choice) > 0:
+                # Prune finished
+                break
+            # Prune last step
+            self.pruneStep()
+
+    # return a list of steps
+    def stepList(self):
+        for step in self.f_solutionStep:
+            yield step
+    
+    # return the last step
+    def lastStep(self):
+        return self.f_solutionStep[-1]
+    
+    # true if solution steps are empty
+    def isEmpty(self):
+        return not bool(self.f_solutionStep)
+
+    # the number of steps
+    def depth(self):
+        return len(self.f_solutionStep)
+
+    # return a snapshot of current solution
+    def snapshot(self):
+        return [
+            (self.board.location(square), choice[0])
+            for (square, choice) in self.stepList()
+        ]
@@ -0,0 +1,194 @@
+# Puzzle generator with unique solutions and difficulty grades
+# A puzzle is made from a random complete grid by removing givens one by
+# one, keeping a removal only when the puzzle still has a unique solution.
+# Every puzzle comes from its own seed, so the output of a seed range does
+# not depend on the number of worker processes.
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from bitboard import FIXED, BitBoard
+from engine import BLANK, UNIT
+from profiling import SolverStats
+from puzzlefile import formatPuzzle
+from search import SEARCH_ENGINE, createSearch
+
+# Grades of puzzles solved without search, from the easiest, with the
+# propagation solving them: singles, then Solver #3, then subsets and fish.
+# A puzzle needing the search is graded "expert".
+GRADE_PROPAGATION = (
+    ("easy", "queue-singles"),
+    ("medium", "queue"),
+    ("hard", "advanced")
+)
+GRADE = tuple(grade for (grade, propagation) in GRADE_PROPAGATION) + ("expert",)
+
+# Generator of puzzles of a board unit
+class Generator:
+    # constructor
+    # engine is the search engine checking uniqueness, symmetric removes
+    # givens in pairs symmetric about the center of the board
+    def __init__(self, unit=UNIT, engine="rules", symmetric=False):
+        self.unit = unit
+        self.engine = engine
+        self.symmetric = symmetric
+        self.board = BitBoard(unit)
+
+    # return a random complete grid as a serial list
+    # The boxes on the diagonal are independent, they are filled with
+    # shuffled numbers and the search completes the rest.
+    def fillGrid(self, rand):
+        board = self.board
+        unit = board.unit
+        length = board.length
+        board.clear()
+        for box in range(unit):
+            numberList = list(range(1, length + 1))
+            rand.shuffle(numberList)
+            for i in range(length):
+                (row, col) = divmod(i, unit)
+                board.assign(board.square(box * unit + col, box * unit + row), numberList[i], FIXED)
+        stream = createSearch(board, self.engine).solutions()
+        (snapshot, grid) = next(stream)
+        stream.close()
+        return list(grid)
+
+    # true if a puzzle has exactly one solution
+    def isUnique(self, q):
+        board = self.board
+        board.clear()
+        board.load(q)
+        return createSearch(board, self.engine).isUnique()
+
+    # Remove givens of a complete grid while the solution stays unique
+    def removeGivens(self, grid, rand):
+        size = len(grid)
+        q = list(grid)
+        order = list(range(size))
+        rand.shuffle(order)
+        for index in order:
+            if q[index] == BLANK:
+                continue
+            pair = {index, size - 1 - index} if self.symmetric else {index}
+            saved = [(i, q[i]) for i in pair]
+            for i in pair:
+                q[i] = BLANK
+            if not self.isUnique(q):
+                for (i, number) in saved:
+                    q[i] = number
+        return q
+
+    # Grade a puzzle with a unique solution
+    # return (grade, branches), branches is the number of search steps
+    def grade(self, q):
+        board = self.board
+        for (grade, propagation) in GRADE_PROPAGATION:
+            board.clear()
+            board.load(q)
+            if board.solve(propagation) == "SOLVED":
+                return (grade, 0)
+        board.clear()
+        board.load(q)
+        board.stats = SolverStats()
+        createSearch(board, "rules", "advanced").run(limit=1)
+        branches = board.stats.branches
+        board.stats = None
+        return ("expert", branches)
+
+    # Generate the puzzle of a seed
+    # return (puzzle, solution, grade, branches)
+    def generate(self, seed):
+        rand = random.Random(seed)
+        grid = self.fillGrid(rand)
+        q = self.removeGivens(grid, rand)
+        (grade, branches) = self.grade(q)
+        return (q, grid, grade, branches)
+
+# Generator of a worker process, created once by initWorker()
+workerGenerator = None
+
+def initWorker(unit, engine, symmetric):
+    global workerGenerator
+    workerGenerator = Generator(unit, engine, symmetric)
+
+# Generate the puzzle of a seed in a worker process
+def generateSeed(seed):
+    return workerGenerator.generate(seed)
+
+# Generate puzzles of count seeds from a seed, yield (puzzle, solution, grade, branches)
+# Puzzles come in the order of the seeds.
+def generatePuzzles(count, seed=0, unit=UNIT, engine="rules", symmetric=False, jobs=1, chunkSize=8):
+    seedRange = range(seed, seed + count)
+    if jobs > 1:
+        with multiprocessing.Pool(jobs, initWorker, (unit, engine, symmetric)) as pool:
+            yield from pool.imap(generateSeed, seedRange, chunkSize)
+    else:
+        generator = Generator(unit, engine, symmetric)
+        for s in seedRange:
+            yield generator.generate(s)
+
+# Format a puzzle in the one-line format, preceded by a comment line of its
+# grade, search steps and number of givens when annotate is true
+def formatLine(result, annotate=False):
+    (q, grid, grade, branches) = result
+    line = formatPuzzle(q)
+    if annotate:
+        givens = sum(1 for number in q if number != BLANK)
+        return "# %s %d %d\n%s" % (grade, branches, givens, line)
+    return line
+
+# Format a puzzle as a JSON object on a line
+def formatJson(result, annotate=False):
+    (q, grid, grade, branches) = result
+    return json.dumps({
+        "puzzle": formatPuzzle(q),
+        "solution": formatPuzzle(grid),
+        "grade": grade,
+        "branches": branches,
+        "givens": sum(1 for number in q if number != BLANK)
+    })
+
+FORMATTER = {
+    "line": formatLine,
+    "json": formatJson
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate puzzles with a unique solution in the one-line format")
+    parser.add_argument("--count", type=int, default=10, help="number of puzzles")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first puzzle")
+    parser.add_argument("--unit", type=int, default=UNIT, help="box size, 3 for 9x9 boards")
+    parser.add_argument("--engine", choices=SEARCH_ENGINE, default="rules", help="search engine checking uniqueness")
+    parser.add_argument("--symmetric", action="store_true", help="remove givens in symmetric pairs")
+    parser.add_argument("--grade", action="append", choices=GRADE, help="write only puzzles of this grade")
+    parser.add_argument("--format", choices=list(FORMATTER), default="line")
+    parser.add_argument("--annotate", action="store_true", help="write the grade as a comment line before a puzzle")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=8, help="puzzles per worker task")
+    args = parser.parse_args()
+    if args.count < 0:
+        parser.error("--count must not be negative")
+    formatter = FORMATTER[args.format]
+    out = sys.stdout
+    nPuzzle = 0
+    gradeCount = dict.fromkeys(GRADE, 0)
+    t = time.perf_counter()
+    for result in generatePuzzles(
+        args.count, args.seed, args.unit, args.engine, args.symmetric, args.jobs, args.chunk_size
+    ):
+        nPuzzle = nPuzzle + 1
+        gradeCount[result[2]] += 1
+        if args.grade is None or result[2] in args.grade:
+            out.write(formatter(result, args.annotate))
+            out.write("\n")
+    t = time.perf_counter() - t
+    print("%d puzzles in %.3f s (%.1f puzzles/min) %s" % (
+        nPuzzle, t, nPuzzle * 60 / t if t > 0 else 0.0,
+        " ".join("%s %d" % (grade, gradeCount[grade]) for grade in GRADE)
+    ), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
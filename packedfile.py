@@ -0,0 +1,210 @@
+# Reading and writing puzzles in a packed binary format
+# A file is a header followed by fixed-size records, one per puzzle or
+# solved grid. A record packs the Squares in row order with cellBits()
+# bits each, 0 for a blank Square, lowest bits first, so a 9x9 puzzle
+# takes 4 bits per Square and 41 bytes.
+#
+# Header, little endian:
+#   magic   4 bytes  b"SDKP"
+#   version 1 byte   PACKED_VERSION
+#   unit    1 byte   box size, 3 for 9x9 boards
+#   bits    1 byte   bits per Square
+#   unused  1 byte   0
+#   count   8 bytes  number of records
+#
+# A reader maps the file into memory, so record i is read in place without
+# parsing the records before it.
+import argparse
+import mmap
+import struct
+import sys
+from itertools import chain
+
+from engine import BLANK, UNIT
+from puzzlefile import formatPuzzle, lineUnit, readPuzzles
+
+PACKED_MAGIC = b"SDKP"
+PACKED_VERSION = 1
+HEADER = struct.Struct("<4sBBBBQ")
+
+# Bits per Square of a board length, enough for 0 and every number
+def cellBits(length):
+    return length.bit_length()
+
+# Bytes of a record of a board unit
+def recordSize(unit):
+    return (unit ** 4 * cellBits(unit * unit) + 7) // 8
+
+# Squares of each byte value for 4 bits per Square: (low, high), BLANK for 0
+NIBBLES = tuple(((byte & 15) or BLANK, (byte >> 4) or BLANK) for byte in range(256))
+
+# Pack a serial list, BLANK or 0 for a free Square, into a record
+def packPuzzle(q, unit):
+    length = unit * unit
+    bits = cellBits(length)
+    size = recordSize(unit)
+    if len(q) != length * length:
+        raise ValueError("puzzle length %d does not fit unit %d" % (len(q), unit))
+    # Every number must fit the bits of a Square
+    for number in q:
+        if number != BLANK and not 0 <= number <= length:
+            raise ValueError("number %r is out of range 1..%d of unit %d" % (number, length, unit))
+    if bits == 4:
+        cells = [0 if number == BLANK else number for number in q]
+        if len(cells) % 2:
+            cells.append(0)
+        return bytes(cells[i] | cells[i + 1] << 4 for i in range(0, len(cells), 2))
+    value = 0
+    for (i, number) in enumerate(q):
+        if number != BLANK:
+            value |= number << (i * bits)
+    return value.to_bytes(size, "little")
+
+# Unpack a record into a serial list, BLANK for a free Square
+def unpackPuzzle(record, unit):
+    length = unit * unit
+    bits = cellBits(length)
+    size = length * length
+    if bits == 4:
+        q = list()
+        extend = q.extend
+        for byte in record:
+            extend(NIBBLES[byte])
+        del q[size:]
+        return q
+    value = int.from_bytes(record, "little")
+    mask = (1 << bits) - 1
+    q = [(value >> (i * bits)) & mask for i in range(size)]
+    return [number if number else BLANK for number in q]
+
+# Write puzzles given as serial lists of a board unit to a packed file
+# return the number of records
+def writePacked(fileName, puzzles, unit):
+    count = 0
+    with open(fileName, "wb") as stream:
+        stream.write(HEADER.pack(PACKED_MAGIC, PACKED_VERSION, unit, cellBits(unit * unit), 0, 0))
+        for q in puzzles:
+            if lineUnit(len(q)) != unit:
+                raise ValueError("record %d: puzzle length %d does not fit unit %d" % (count, len(q), unit))
+            stream.write(packPuzzle(q, unit))
+            count = count + 1
+        # The count is known at the end
+        stream.seek(0)
+        stream.write(HEADER.pack(PACKED_MAGIC, PACKED_VERSION, unit, cellBits(unit * unit), 0, count))
+    return count
+
+# true if a file starts with the magic of a packed file
+def isPacked(fileName):
+    with open(fileName, "rb") as stream:
+        return stream.read(len(PACKED_MAGIC)) == PACKED_MAGIC
+
+# packed puzzle file class
+# Records are read in place from a read-only memory map of the file.
+class PackedPuzzles:
+    __slots__ = ("fileName", "stream", "map", "view", "unit", "count", "size")
+
+    # constructor
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.stream = open(fileName, "rb")
+        try:
+            header = self.stream.read(HEADER.size)
+            if len(header) < HEADER.size or header[:len(PACKED_MAGIC)] != PACKED_MAGIC:
+                raise ValueError("%s is not a packed puzzle file" % fileName)
+            (magic, version, unit, bits, unused, count) = HEADER.unpack(header)
+            if version != PACKED_VERSION:
+                raise ValueError("%s: unsupported version %d" % (fileName, version))
+            if unit < 1 or bits != cellBits(unit * unit):
+                raise ValueError("%s: %d bits per Square do not fit unit %d" % (fileName, bits, unit))
+            self.unit = unit
+            self.count = count
+            self.size = recordSize(unit)
+            self.map = mmap.mmap(self.stream.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.map) != HEADER.size + count * self.size:
+                self.map.close()
+                raise ValueError("%s: file size does not fit %d records" % (fileName, count))
+        except Exception:
+            self.stream.close()
+            raise
+        self.view = memoryview(self.map)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+            self.map.close()
+            self.stream.close()
+
+    def __len__(self):
+        return self.count
+
+    # return the record of puzzle i as a memoryview into the file
+    def record(self, i):
+        if i < 0:
+            i += self.count
+        if i < 0 or i >= self.count:
+            raise IndexError("record %d out of %d" % (i, self.count))
+        offset = HEADER.size + i * self.size
+        return self.view[offset:offset + self.size]
+
+    # return puzzle i as a serial list, BLANK for a free Square
+    def __getitem__(self, i):
+        return unpackPuzzle(self.record(i), self.unit)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    # Puzzles in the form of readPuzzles(), yield (line, serial list)
+    def readPuzzles(self):
+        for q in self:
+            yield (formatPuzzle(q), q)
+
+# Convert a file in the one-line format to a packed file
+def packCommand(args):
+    with open(args.input) as stream:
+        # The first puzzle gives the unit, the rest are streamed after it
+        puzzles = (q for (line, q) in readPuzzles(stream))
+        first = next(puzzles, None)
+        if first is None:
+            unit = args.unit
+            puzzles = list()
+        else:
+            unit = lineUnit(len(first))
+            puzzles = chain([first], puzzles)
+        count = writePacked(args.output, puzzles, unit)
+    print("%d records of unit %d, %d bytes each" % (count, unit, recordSize(unit)), file=sys.stderr)
+
+# Write a packed file, or some of its records, in the one-line format
+def unpackCommand(args):
+    with PackedPuzzles(args.input) as packed:
+        indexList = args.index if args.index else range(len(packed))
+        for i in indexList:
+            print(formatPuzzle(packed[i]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert puzzles between the one-line format and the packed binary format")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_pack = subparsers.add_parser("pack", help="one-line format to packed")
+    parser_pack.add_argument("input", help="puzzle file in the one-line format")
+    parser_pack.add_argument("output", help="packed file to write")
+    parser_pack.add_argument("--unit", type=int, default=UNIT, help="unit of an empty input")
+    parser_pack.set_defaults(func=packCommand)
+    parser_unpack = subparsers.add_parser("unpack", help="packed to one-line format")
+    parser_unpack.add_argument("input", help="packed file")
+    parser_unpack.add_argument("--index", type=int, action="append", help="write only this record")
+    parser_unpack.set_defaults(func=unpackCommand)
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except (ValueError, IndexError) as e:
+        sys.exit("%s: %s" % (parser.prog, e))
+
+if __name__ == "__main__":
+    main()
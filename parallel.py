@@ -0,0 +1,205 @@
+# Parallel search of a single puzzle by splitting the search tree
+# The first branch points of the search are expanded in the parent process
+# into independent subproblems, each a fixed list of assumptions. The
+# subproblems are farmed out to a pool of worker processes which run the
+# ordinary Search below their prefix. There are several subproblems per
+# worker and an idle worker takes the next one from the queue of the pool,
+# so workers finishing small subtrees early keep working on the others.
+# Results are merged in the order of the subproblems, which is the order
+# of the serial search, so the solution list is the same as Search.run().
+# A worker sends back at most BATCH_SIZE solutions of a subproblem, a
+# larger subtree is split again by its next branch point, and only a few
+# subproblems per worker are in flight, so memory stays bounded even when
+# all solutions of a puzzle are listed.
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from bitboard import PROPAGATION, BitBoard
+from puzzlefile import lineUnit, parsePuzzle
+from search import Search, collectSolutions
+
+# Subproblems made for each worker process
+TASKS_PER_JOB = 8
+# Deepest branch point the tree is split at
+SPLIT_DEPTH = 6
+# Solutions a worker sends back for one subproblem at most
+BATCH_SIZE = 1000
+# Subproblems in flight for each worker process
+TASKS_IN_FLIGHT = 2
+
+# Expand a prefix of assumptions on a loaded board by its next branch point
+# return a list of (prefix, status) of the children in search order,
+# without the conflicted ones
+def expandPrefix(board, q, prefix, propagation):
+    board.clear()
+    board.load(q)
+    status = board.solve(propagation)
+    for (square, number) in prefix:
+        status = board.assume(square, number, propagation)
+    square = board.findFreeSquare()
+    childList = list()
+    mark = len(board.trail)
+    for number in board.choiceList(square):
+        status = board.assume(square, number, propagation)
+        if status != "CONFLICTED":
+            childList.append((prefix + ((square, number),), status))
+        board.undo(mark)
+    return childList
+
+# Split the search tree of a puzzle into prefixes of assumptions
+# The tree is expanded a level at a time until there are count prefixes or
+# depth levels. A prefix solving the puzzle is kept as it is.
+# return (list of prefixes in search order, assumptions tried), or None
+# for the list when propagation alone decides the puzzle, an empty list
+# when the givens repeat a number
+def splitTree(q, propagation="queue", count=TASKS_PER_JOB, depth=SPLIT_DEPTH):
+    board = BitBoard(lineUnit(len(q)))
+    board.load(q)
+    if board.hasDuplicate():
+        return (list(), 0)
+    if board.solve(propagation) != "UNRESOLVED":
+        return (None, 0)
+    # (prefix, open) where open prefixes may still be expanded
+    frontier = [((), True)]
+    nodes = 0
+    for level in range(depth):
+        if len(frontier) >= count:
+            break
+        expanded = list()
+        for (prefix, isOpen) in frontier:
+            if not isOpen:
+                expanded.append((prefix, False))
+                continue
+            for (child, status) in expandPrefix(board, q, prefix, propagation):
+                nodes += 1
+                expanded.append((child, status == "UNRESOLVED"))
+        frontier = expanded
+    return ([prefix for (prefix, isOpen) in frontier], nodes)
+
+# Board and puzzle of a worker process, set once by initWorker()
+workerBoard = None
+workerPuzzle = None
+workerPropagation = None
+workerLimit = None
+
+def initWorker(q, propagation, limit):
+    global workerBoard, workerPuzzle, workerPropagation, workerLimit
+    workerBoard = BitBoard(lineUnit(len(q)))
+    workerPuzzle = q
+    workerPropagation = propagation
+    workerLimit = limit
+
+# Search the subtree below a prefix in a worker process
+# return (list of (snapshot, grid), assumptions tried, exhausted, children):
+# children is None, or the list of prefixes to search instead when the
+# subtree has more than BATCH_SIZE solutions to send back
+def searchPrefix(prefix):
+    board = workerBoard
+    board.clear()
+    board.load(workerPuzzle)
+    search = Search(board, workerPropagation)
+    stream = search.solutions(prefix=prefix)
+    if workerLimit is not None and workerLimit <= BATCH_SIZE:
+        resultList = list(islice(stream, workerLimit))
+    else:
+        resultList = list(islice(stream, BATCH_SIZE + 1))
+    stream.close()
+    if len(resultList) > BATCH_SIZE:
+        childList = [child for (child, status) in expandPrefix(board, workerPuzzle, prefix, workerPropagation)]
+        return (None, search.nodes, False, childList)
+    return (resultList, search.nodes, search.exhausted, None)
+
+# parallel search class
+class ParallelSearch:
+    __slots__ = ("q", "propagation", "jobs", "solutionList", "gridList", "exhausted", "nodes", "tasks")
+
+    # constructor
+    # q is the puzzle as a serial list, BLANK for a free Square
+    def __init__(self, q, propagation="queue", jobs=None):
+        if lineUnit(len(q)) is None:
+            raise ValueError("puzzle length %d is not a square board" % len(q))
+        self.q = list(q)
+        self.propagation = propagation
+        self.jobs = jobs if jobs is not None else os.cpu_count()
+        self.solutionList = list()
+        self.gridList = list()
+        # True when the search has scanned all branches
+        self.exhausted = False
+        # Number of assumptions tried by the split and the workers
+        self.nodes = 0
+        # Number of subproblems
+        self.tasks = 0
+
+    # Search solutions in the order of the serial search, yield
+    # (Solution.snapshot(), bytes of the numbers of all Squares)
+    # Every subproblem is searched up to limit solutions, unless limit is None.
+    def solutions(self, limit=None):
+        self.exhausted = False
+        (prefixList, self.nodes) = splitTree(self.q, self.propagation, self.jobs * TASKS_PER_JOB)
+        if prefixList is None:
+            # Propagation decides the puzzle
+            prefixList = [()]
+        self.tasks = len(prefixList)
+        if not prefixList:
+            # The givens repeat a number
+            self.exhausted = True
+            return
+        exhausted = True
+        # Subproblems in search order as [prefix, pending result or None]
+        taskList = deque([prefix, None] for prefix in prefixList)
+        with multiprocessing.Pool(self.jobs, initWorker, (self.q, self.propagation, limit)) as pool:
+            while taskList:
+                for task in islice(taskList, self.jobs * TASKS_IN_FLIGHT):
+                    if task[1] is None:
+                        task[1] = pool.apply_async(searchPrefix, (task[0],))
+                (resultList, nodes, taskExhausted, childList) = taskList.popleft()[1].get()
+                self.nodes += nodes
+                if childList is not None:
+                    # Too many solutions, search the children in its place
+                    self.tasks += len(childList)
+                    taskList.extendleft([child, None] for child in reversed(childList))
+                    continue
+                exhausted = exhausted and taskExhausted
+                yield from resultList
+        self.exhausted = exhausted
+
+    # Search solutions, return a list of Solution.snapshot()
+    # The search stops as soon as limit solutions are found, unless limit is None.
+    def run(self, limit=None):
+        return collectSolutions(self, self.solutions(limit), limit)
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the solutions of one puzzle on a pool of worker processes")
+    parser.add_argument("puzzle", help="puzzle in the one-line format")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--propagation", choices=list(PROPAGATION), default="queue")
+    parser.add_argument("--limit", type=int, default=None, help="stop at this number of solutions")
+    parser.add_argument("--print", action="store_true", help="print the steps of every solution")
+    args = parser.parse_args()
+    try:
+        q = parsePuzzle(args.puzzle)
+    except ValueError as e:
+        parser.error(str(e))
+    search = ParallelSearch(q, args.propagation, args.jobs)
+    t = time.perf_counter()
+    n = 0
+    stream = search.solutions(args.limit)
+    for (steps, grid) in islice(stream, args.limit):
+        if args.print:
+            print("#%d %s" % (n, steps))
+        n = n + 1
+    stream.close()
+    t = time.perf_counter() - t
+    if n == 0 and search.exhausted:
+        print("CONFLICTED")
+    print("%d%s solutions, %d nodes, %d subproblems in %.3f s on %d jobs" % (
+        n, "" if search.exhausted else "+", search.nodes, search.tasks, t, args.jobs
+    ), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Profiling counters of the solver rules and the search
+# A solver holds a SolverStats in its stats attribute. None disables
+# profiling, then the rules only pay for a test against None.
+
+from time import perf_counter
+
+from tracing import (
+    RULE_LAST_POSITIVE, RULE_LAST_IN_GROUP, RULE_INDIRECT_CLUSTER,
+    RULE_NAKED_SUBSET, RULE_HIDDEN_SUBSET, RULE_FISH
+)
+
+# Solver #1, #2 and #3 in the order of Board.solve(), then the rules of
+# the "advanced" propagation of BitBoard
+STATS_RULES = (
+    RULE_LAST_POSITIVE, RULE_LAST_IN_GROUP, RULE_INDIRECT_CLUSTER,
+    RULE_NAKED_SUBSET, RULE_HIDDEN_SUBSET, RULE_FISH
+)
+
+# solver statistics class
+class SolverStats:
+    __slots__ = (
+        "fires", "eliminated", "visits", "seconds", "propagations", "passes",
+        "nodes", "branches", "backtracks", "solutions"
+    )
+
+    # constructor
+    def __init__(self):
+        self.reset()
+
+    # Clear all counters
+    def reset(self):
+        # Assignments or eliminations made by each rule
+        self.fires = dict.fromkeys(STATS_RULES, 0)
+        # Candidates removed from negative sets by each rule
+        self.eliminated = dict.fromkeys(STATS_RULES, 0)
+        # Squares, Groups or Clusters examined by each rule
+        self.visits = dict.fromkeys(STATS_RULES, 0)
+        self.seconds = dict.fromkeys(STATS_RULES, 0.0)
+        # Runs of the rules to a fixpoint and full passes in them
+        self.propagations = 0
+        self.passes = 0
+        # Assumptions tried, choice points, returns to a choice point and solutions
+        self.nodes = 0
+        self.branches = 0
+        self.backtracks = 0
+        self.solutions = 0
+
+    # Count a firing of a rule removing candidates
+    def fire(self, rule, eliminated):
+        self.fires[rule] += 1
+        self.eliminated[rule] += eliminated
+
+    # Add the time since t to a rule, return the current time
+    def lap(self, rule, t):
+        now = perf_counter()
+        if rule is not None:
+            self.seconds[rule] += now - t
+        return now
+
+    # Add the counters of other stats
+    def merge(self, other):
+        for rule in STATS_RULES:
+            self.fires[rule] += other.fires[rule]
+            self.eliminated[rule] += other.eliminated[rule]
+            self.visits[rule] += other.visits[rule]
+            self.seconds[rule] += other.seconds[rule]
+        self.propagations += other.propagations
+        self.passes += other.passes
+        self.nodes += other.nodes
+        self.branches += other.branches
+        self.backtracks += other.backtracks
+        self.solutions += other.solutions
+
+    # return a dict of the counters
+    def record(self):
+        return {
+            "rules": {
+                rule: {
+                    "fires": self.fires[rule],
+                    "eliminated": self.eliminated[rule],
+                    "visits": self.visits[rule],
+                    "seconds": self.seconds[rule]
+                }
+                for rule in STATS_RULES
+            },
+            "propagations": self.propagations,
+            "passes": self.passes,
+            "nodes": self.nodes,
+            "branches": self.branches,
+            "backtracks": self.backtracks,
+            "solutions": self.solutions
+        }
+
+    # return a table of the counters as lines
+    def summary(self):
+        lines = ["%-18s %10s %12s %12s %12s" % ("rule", "fires", "eliminated", "visits", "time ms")]
+        for rule in STATS_RULES:
+            lines.append("%-18s %10d %12d %12d %12.3f" % (
+                rule, self.fires[rule], self.eliminated[rule],
+                self.visits[rule], self.seconds[rule] * 1000
+            ))
+        lines.append("propagations %d, passes %d" % (self.propagations, self.passes))
+        lines.append("search nodes %d, branches %d, backtracks %d, solutions %d" % (
+            self.nodes, self.branches, self.backtracks, self.solutions
+        ))
+        return lines
@@ -0,0 +1,72 @@
+# Reading and writing puzzles in the one-line format
+# A puzzle is a line of length * length characters in row order,
+# '.' or '0' for a blank Square, '1'-'9' then 'A'-'Z' for numbers.
+# Boards of length 36 have one number more than these symbols, they use
+# '0'-'9' then 'A'-'Z' for numbers 1 to 36 and only '.' for a blank Square.
+# Empty lines and lines starting with '#' are skipped.
+
+from engine import BLANK
+
+DIGITS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+BLANK_CHARS = ".0"
+WIDE_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+WIDE_BLANK_CHARS = "."
+
+# return (digits, blank characters) of a board length
+def alphabet(length):
+    if length <= len(DIGITS):
+        return (DIGITS, BLANK_CHARS)
+    if length <= len(WIDE_DIGITS):
+        return (WIDE_DIGITS, WIDE_BLANK_CHARS)
+    raise ValueError("board length %d has more numbers than the one-line format" % length)
+
+# Board unit of a puzzle line, None when the length does not fit any board
+def lineUnit(length):
+    unit = 1
+    while unit ** 4 < length:
+        unit = unit + 1
+    if unit ** 4 == length:
+        return unit
+    return None
+
+# Parse a puzzle line into a serial list of numbers and BLANK
+def parsePuzzle(line):
+    unit = lineUnit(len(line))
+    if unit is None:
+        raise ValueError("puzzle length %d is not a square board" % len(line))
+    length = unit * unit
+    (digits, blankChars) = alphabet(length)
+    q = list()
+    for c in line:
+        if c in blankChars:
+            q.append(BLANK)
+            continue
+        number = digits.find(c.upper()) + 1
+        if number < 1 or number > length:
+            raise ValueError("invalid character %r in puzzle" % c)
+        q.append(number)
+    return q
+
+# Format a serial list of numbers, BLANK or 0 as a puzzle line
+def formatPuzzle(q):
+    unit = lineUnit(len(q))
+    if unit is None:
+        raise ValueError("puzzle length %d is not a square board" % len(q))
+    (digits, blankChars) = alphabet(unit * unit)
+    return "".join(
+        "." if number == BLANK or not number else digits[number - 1]
+        for number in q
+    )
+
+# Read puzzles from a text stream one by one, yield (line, serial list)
+def readPuzzles(stream):
+    lineNumber = 0
+    for line in stream:
+        lineNumber = lineNumber + 1
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            yield (line, parsePuzzle(line))
+        except ValueError as e:
+            raise ValueError("line %d: %s" % (lineNumber, e))
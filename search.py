@@ -0,0 +1,163 @@
+# Exhaustive search over assumptions on a BitBoard
+# Each branch is undone through the trail of the board instead of
+# replaying all steps of the Solution from a cleared board.
+
+from itertools import islice
+
+from engine import Solution
+from tracing import RULE_ASSUME
+
+# Number of solutions each search mode stops at, None for all solutions
+SEARCH_LIMIT = {
+    "first": 1,
+    "unique": 2,
+    "all": None
+}
+
+# Collect up to limit solutions of a stream into the solutionList and
+# gridList of a search, all of them when limit is None
+# return the solutionList
+def collectSolutions(search, stream, limit):
+    search.solutionList = list()
+    search.gridList = list()
+    for (snapshot, grid) in islice(stream, limit):
+        search.solutionList.append(snapshot)
+        search.gridList.append(grid)
+    stream.close()
+    return search.solutionList
+
+# Count up to limit solutions of a stream without keeping them, all of
+# them when limit is None
+def countSolutions(stream, limit):
+    n = sum(1 for solution in islice(stream, limit))
+    stream.close()
+    return n
+
+# Add the counters of a run of a search to the stats of its board
+def countStats(search, branches, backtracks):
+    stats = search.board.stats
+    if stats is not None:
+        stats.nodes += search.nodes
+        stats.branches += branches
+        stats.backtracks += backtracks
+        stats.solutions += search.found
+
+# search class
+class Search:
+    __slots__ = ("board", "propagation", "solutionList", "gridList", "exhausted", "nodes", "found", "stopped")
+
+    # constructor
+    def __init__(self, board, propagation="queue"):
+        self.board = board
+        self.propagation = propagation
+        self.solutionList = list()
+        # bytes of the numbers of all Squares for each solution
+        self.gridList = list()
+        # True when the search has scanned all branches
+        self.exhausted = False
+        # Number of assumptions tried by the search
+        self.nodes = 0
+        # Number of solutions found by the search
+        self.found = 0
+        # True when stop() is called
+        self.stopped = False
+
+    # Search solutions, return a list of Solution.snapshot()
+    # The search stops as soon as limit solutions are found, unless limit is None.
+    # onStep(solution, status) is called after every assumption when given.
+    def run(self, onStep=None, limit=None):
+        return collectSolutions(self, self.solutions(onStep), limit)
+
+    # Search solutions lazily, yield (Solution.snapshot(), bytes of the numbers
+    # of all Squares) as soon as each one is found
+    # Only the current search path is held, so a caller may stream the
+    # solutions or stop iterating at any time. exhausted is true when the
+    # search scanned all branches before the generator ended.
+    # prefix is a list of (Square index, number) assumed in order before the
+    # search, which then only scans the subtree below them. Snapshots start
+    # with the steps of the prefix.
+    # Assumptions are sent to the trace of the board as events when it has one,
+    # and the search is counted in the stats of the board when it has one.
+    def solutions(self, onStep=None, prefix=()):
+        board = self.board
+        trace = board.trace
+        self.exhausted = False
+        self.nodes = 0
+        self.found = 0
+        branches = 0
+        backtracks = 0
+        try:
+            status = board.solve(self.propagation)
+            for (square, number) in prefix:
+                if status != "UNRESOLVED":
+                    break
+                status = board.assume(square, number, self.propagation)
+            prefixSteps = [(board.location(square), number) for (square, number) in prefix]
+            if status != "UNRESOLVED":
+                self.exhausted = True
+            if status == "SOLVED":
+                self.found += 1
+                yield (prefixSteps, bytes(board.number))
+            if status != "UNRESOLVED":
+                return
+            solution = Solution(board)
+            branches = 1
+            # Trail length before the current choice of each step
+            markList = [len(board.trail)]
+            while not self.stopped:
+                # Try a solution
+                (square, choice) = solution.lastStep()
+                board.depth = solution.depth()
+                status = board.assume(square, choice[0], self.propagation)
+                self.nodes += 1
+                if trace is not None:
+                    board.traceEvent(RULE_ASSUME, square, [choice[0]], status)
+                if onStep is not None:
+                    onStep(solution, status)
+                if status == "UNRESOLVED":
+                    # Select a new step
+                    solution.appendStep(board)
+                    markList.append(len(board.trail))
+                    branches += 1
+                    continue
+                if status == "SOLVED":
+                    self.found += 1
+                    yield (prefixSteps + solution.snapshot(), bytes(board.number))
+                # Prune a leaf
+                solution.pruneLeaf()
+                if solution.isEmpty():
+                    # All solutions are scanned
+                    self.exhausted = True
+                    break
+                # Back to the choice point of the last step
+                del markList[solution.depth():]
+                board.undo(markList[-1])
+                backtracks += 1
+        finally:
+            board.depth = 0
+            countStats(self, branches, backtracks)
+
+    # Stop the search at the next assumption, may be called from another thread
+    def stop(self):
+        self.stopped = True
+
+    # Count solutions up to limit without keeping them
+    def count(self, limit=None):
+        return countSolutions(self.solutions(), limit)
+
+    # true if the board has exactly one solution
+    def isUnique(self):
+        return self.count(SEARCH_LIMIT["unique"]) == 1
+
+# Names of the search engines
+SEARCH_ENGINE = ("rules", "dlx")
+
+# Create a search of an engine on a board
+# "rules" is Search with the deduction rules, "dlx" is DancingLinks.
+def createSearch(board, engine="rules", propagation="queue"):
+    if engine == "rules":
+        return Search(board, propagation)
+    if engine == "dlx":
+        from dlx import DancingLinks
+        return DancingLinks(board)
+    raise ValueError("unknown search engine %r" % engine)
@@ -1,565 +1,120 @@
+import threading
 import tkinter
 
+from engine import UNIT, Board, exampleBoard
+from bitboard import BitBoard
+from search import Search
+from tracing import TraceEvent, PrintTrace, RULE_CLICK
+
 TILE_WIDTH = 36
 TILE_HEIGHT = 36
 TILE_FONT = ("monospace", 28)
+TILE_SMALL_FONT = ("monospace", 16)
 TILE_GAP = 2
 TILE_UNIT = 3
 PAD = 20
+# Print solver events and debug data on the console
+TRACE = True
+# Interval of the GUI polling a running solver in milliseconds
+FRAME_MS = 50
+
+SQUARE_COLOR = [
+    "#5533FF",
+    "#5533CC",
+    "#553399",
+    "#553366",
+    "#553355",
+    "#663333",
+    "#993333",
+    "#CC3333",
+    "#FF3355",
+    "#000000"
+]
+
+# Color of a free Square by the ratio of its negative numbers
+# SQUARE_COLOR is indexed directly on 9x9 boards and scaled on larger boards.
+def squareColor(nNegative, length):
+    return SQUARE_COLOR[nNegative * (len(SQUARE_COLOR) - 1) // length]
+
+# Canvas items of the Squares of a board
+# Every Square has one text item and one rectangle item created once, and
+# a redraw only configures the items of the Squares in board.dirty whose
+# appearance changed, so its cost follows the changes, not the board.
+class BoardView:
+    __slots__ = ("canvas", "board", "textDict", "rectDict", "shownDict")
 
-# square class
-class Square:
     # constructor
-    def __init__(self, board, col, row):
+    def __init__(self, canvas, board):
+        self.canvas = canvas
         self.board = board
-        self.col = col
-        self.row = row
-        self.hcluster = None
-        self.vcluster = None
-        self.unassign()
-        self.resetNegative()
-    
-    # Assign a number to the Square
-    def assign(self, number, status="assigned"):
-        assert(number in self.board.numberSet)
-        self.number = number
-        self.status = status
-
-    # Unassign number of the Square
-    def unassign(self):
-        self.status = "free"
-        self.number = None
-
-    # Draw the number in a Square with a color
-    def drawInColor(self, canvas, color):
-        canvas.create_text(
-            (self.col + 0.5) * TILE_WIDTH,
-            (self.row + 0.5) * TILE_HEIGHT,
-            text=str(self.number),
-            fill=color,
-            font=TILE_FONT,
-            tag="square"
-        )
-
-    # Fill the Square with a color
-    def fillInColor(self, canvas, color):
-        canvas.create_rectangle(
-            (self.col + 0.1) * TILE_WIDTH,
-            (self.row + 0.1) * TILE_HEIGHT,
-            (self.col + 0.9) * TILE_WIDTH,
-            (self.row + 0.9) * TILE_HEIGHT,
-            fill=color,
-            width=0,
-            tag="square"
-        )
-
-    SQUARE_COLOR = [
-        "#5533FF",
-        "#5533CC",
-        "#553399",
-        "#553366",
-        "#553355",
-        "#663333",
-        "#993333",
-        "#CC3333",
-        "#FF3355",
-        "#000000"
-    ]
-
-    # Draw a Square
-    def draw(self, canvas):
-        if self.status == "fixed":
-            self.drawInColor(canvas, "red")
-        elif self.status == "assigned":
-            self.drawInColor(canvas, "blue")
+        self.textDict = dict()
+        self.rectDict = dict()
+        # Appearance drawn for each Square, None before the first draw
+        self.shownDict = dict()
+        for square in board.squareList():
+            self.rectDict[square] = canvas.create_rectangle(
+                (square.col + 0.1) * TILE_WIDTH,
+                (square.row + 0.1) * TILE_HEIGHT,
+                (square.col + 0.9) * TILE_WIDTH,
+                (square.row + 0.9) * TILE_HEIGHT,
+                width=0,
+                state="hidden",
+                tag="square"
+            )
+            self.textDict[square] = canvas.create_text(
+                (square.col + 0.5) * TILE_WIDTH,
+                (square.row + 0.5) * TILE_HEIGHT,
+                state="hidden",
+                tag="square"
+            )
+            self.shownDict[square] = None
+        board.dirty = set(board.squareList())
+
+    # Draw the changed Squares
+    def draw(self):
+        dirty = self.board.dirty
+        for square in dirty:
+            self.drawSquare(square)
+        dirty.clear()
+
+    # return (number, color) of a Square, number None for a colored free Square
+    def appearance(self, square):
+        if square.status == "fixed":
+            return (square.number, "red")
+        if square.status == "assigned":
+            return (square.number, "blue")
+        return (None, squareColor(len(square.negative()), self.board.length))
+
+    # Draw a Square unless it looks the same
+    def drawSquare(self, square):
+        shown = self.appearance(square)
+        if shown == self.shownDict[square]:
+            return
+        self.shownDict[square] = shown
+        (number, color) = shown
+        canvas = self.canvas
+        if number is None:
+            canvas.itemconfigure(self.textDict[square], state="hidden")
+            canvas.itemconfigure(self.rectDict[square], fill=color, state="normal")
         else:
-            nNegative = len(self.negative())
-            self.fillInColor(canvas, Square.SQUARE_COLOR[nNegative])
-
-    # Reset negative set
-    def resetNegative(self):
-        self.f_negative = set()
-    
-    def addNegative(self, number):
-        self.f_negative.add(number)
-
-    def negative(self):
-        return self.f_negative
-    
-    # Set all negative flags
-    def negateAll(self):
-        self.f_negative.update(self.board.numberSet)
-
-    # add negative flag in groups
-    def negateGroup(self):
-        self.negateAll()
-        for cluster in [self.hcluster, self.vcluster]:
-            for group in cluster.groupList():
-                group.addNegative(self.number)
-
-# cluster class
-class Cluster:
-    #constructor
-    def __init__(self, board):
-        self.board = board
-        self.f_squareList = list()
-        self.linearGroup = None
-        self.bulkGroup = None
-
-    # append a Square to this Cluster
-    def append(self, square):
-        self.f_squareList.append(square)
-
-    # a set of elements never contained in this Cluster
-    def negative(self):
-        negSet = set(self.board.numberSet)
-        for square in self.squareList():
-            negSet &= square.negative()
-        return negSet
-    
-    # add a number to the negative of cluster member
-    def addNegative(self, number):
-        for square in self.squareList():
-            square.addNegative(number)
-    
-    # a list of Square in this Cluster
-    def squareList(self):
-        for square in self.f_squareList:
-            yield square
-    
-    def groupList(self):
-        yield self.linearGroup
-        yield self.bulkGroup
-
-class Group:
-    #constructor
-    def __init__(self):
-        self.f_clusterList = list()
-
-    # append a Cluster to this Group    
-    def append(self, cluster):
-        self.f_clusterList.append(cluster)
-
-    # add a number to the negative of cluster member
-    def addNegative(self, number):
-        for cluster in self.clusterList():
-            cluster.addNegative(number)
-    
-    # the list of Cluster in this Group
-    def clusterList(self):
-        for cluster in self.f_clusterList:
-            yield cluster
-
-    # the list of Square in this Group
-    def squareList(self):
-        for cluster in self.clusterList():
-            for square in cluster.squareList():
-                yield square
-
-    # the list of "free" Square in this Group
-    def freeSquareList(self):
-        for cluster in self.clusterList():
-            for square in cluster.squareList():
-                if square.status == "free":
-                    yield square
-
-# board class
-class Board:
-    # constructor
-    def __init__(self, unit):
-        self.unit = unit
-        # define board length
-        self.length = unit * unit
-        # Fill Square on board
-        self.f_squareList = list()
-        for row in range(self.length):
-            for col in range(self.length):
-                self.f_squareList.append(Square(self, col, row))
-        # Construct horizontal cluster
-        self.hClusterList = list()
-        for row in range(self.length):
-            for cbase in range(0, self.length, self.unit):
-                cluster = Cluster(self)
-                for col in range(cbase, cbase + self.unit):
-                    cluster.append(self.square(col, row))
-                self.hClusterList.append(cluster)
-                for square in cluster.squareList():
-                    square.hcluster = cluster
-        # Construct vertial cluster
-        self.vClusterList = list()
-        for col in range(self.length):
-            for rbase in range(0, self.length, self.unit):
-                cluster = Cluster(self)
-                for row in range(rbase, rbase + self.unit):
-                    cluster.append(self.square(col, row))
-                self.vClusterList.append(cluster)
-                for square in cluster.squareList():
-                    square.vcluster = cluster
-        # Construct groupList
-        self.hGroupList = list()
-        for row in range(self.length):
-            group = Group()
-            for col in range(self.unit):
-                group.append(self.hClusterList[row * self.unit + col])
-            self.hGroupList.append(group)
-            for cluster in group.clusterList():
-                cluster.linearGroup = group
-        for rbase in range(0, self.length, self.unit):
-            for col in range(self.unit):
-                group = Group()
-                for row in range(rbase, rbase + self.unit):
-                    group.append(self.hClusterList[row * self.unit + col])
-                self.hGroupList.append(group)
-                for cluster in group.clusterList():
-                    cluster.bulkGroup = group
-        self.vGroupList = list()
-        for col in range(self.length):
-            group = Group()
-            for row in range(self.unit):
-                group.append(self.vClusterList[col * self.unit + row])
-            self.vGroupList.append(group)
-            for cluster in group.clusterList():
-                cluster.linearGroup = group
-        for cbase in range(0, self.length, self.unit):
-            for row in range(self.unit):
-                group = Group()
-                for col in range(cbase, cbase + self.unit):
-                    group.append(self.vClusterList[col * self.unit + row])
-                self.vGroupList.append(group)
-                for cluster in group.clusterList():
-                    cluster.bulkGroup = group
-        # Define a set of all number to se put
-        self.numberSet =frozenset({i+1 for i in range(self.length)})
-
-    # return a Square on the board
-    def square(self, col, row):
-        return self.f_squareList[row*self.length+col]
-
-    def squareAt(self, pivot):
-        return self.square(pivot.col(), pivot.row())
-
-    # return a serial list of Square
-    def squareList(self):
-        for square in self.f_squareList:
-            yield square
-
-    # return a serial list of "free" Square
-    def freeSquareList(self):
-        for square in self.f_squareList:
-            if square.status == "free":
-                yield square
-
-    # draw the board on the canvas
-    def draw(self, canvas):
-        canvas.delete("square")
-        for square in self.squareList():
-            square.draw(canvas)
-    
-    # return combined Group list
-    def groupList(self):
-        for group in self.hGroupList:
-            yield group
-        for group in self.vGroupList:
-            yield group
-
-    # return combined Cluster list
-    def clusterList(self):
-        for cluster in self.hClusterList:
-            yield cluster
-        for cluster in self.vClusterList:
-            yield cluster
-
-    def resetNegative(self):
-        for square in self.squareList():
-            square.resetNegative()
-
-    # Unassign all "assigned" Square
-    def unassign(self):
-        for square in self.squareList():
-            if square.status == "assigned":
-                square.unassign()
-
-    # Find a free Square with longest negative
-    def findFreeSquare(self):
-        found = None
-        nNegative = 0
-        for square in self.squareList():
-            if square.status == "free":
-                if len(square.negative()) > nNegative:
-                    found = square
-                    nNegative = len(square.negative())
-        return found
-
-    # Solver function
-    def solve(self):
-        # Clear all negative set
-        self.resetNegative()
-        # initialize negative set
-        for square in self.squareList():
-            if square.status == "fixed":
-                square.negateGroup()
-            elif square.status == "assigned":
-                square.negateGroup()
-        # Attempt solver algorithm as possible
-        solved = False  # Flag indicating solver completion
-        while not solved:
-            solved = True
-            # Soler #1: Last positive
-            # When the Negative set of a Square has all Numbers except one,
-            # the Square is assigned to the last positive Number not contained in the Negative set.
-            for square in self.freeSquareList():
-                nPositive = self.length - len(square.negative())
-                if nPositive == 0:
-                    return "CONFLICTED"
-                elif nPositive == 1:
-                    square.assign(set(self.numberSet).difference(square.negative()).pop())
-                    print("Last positive %d at (%d,%d)" % (square.number, square.col, square.row))
-                    square.negateGroup()
-                    solved = False
-            # Solver #2: Last positive in group
-            # When all Square in a Group has a Number in their Negative set except a Square,
-            # the Square not having the Number in its Negative set is assigned to the Number.
-            for number in self.numberSet:
-                for group in self.groupList():
-                    nPositive = 0
-                    for square in group.freeSquareList():
-                        if not (number in square.negative()):
-                            nPositive = nPositive + 1
-                    if nPositive == 1:
-                        for square in group.freeSquareList():
-                            if not (number in square.negative()):
-                                square.assign(number)
-                                print("Last in group %d at (%d,%d)" % (square.number, square.col, square.row))
-                                square.negateGroup()
-                                solved = False
-            # Solver #3: Indirect negative cluster
-            # When all Cluster except one in a Group has a Number in their Negative set,
-            # other Cluster in the other Group of the last Cluster have the Number in their Negative set
-            for cluster in self.clusterList():
-                # Attempt to linear group
-                # Specify Numbers contained in Negative sets of other Clusters in a Group as negative.
-                negative = set(self.numberSet)
-                for otherCluster in cluster.linearGroup.clusterList():
-                    if otherCluster is not cluster:
-                        negative &= otherCluster.negative()
-                # Negate the positive Numbers in the other Cluster in another Group.
-                positive = negative - cluster.negative()
-                if len(positive) > 0:
-                    for otherCluster in cluster.bulkGroup.clusterList():
-                        if otherCluster is not cluster:
-                            for square in otherCluster.squareList():
-                                if len(positive - square.negative()) > 0:
-                                    print("Negate %s at bulk(%d,%d)" % (str(positive), square.col, square.row))
-                                    square.negative().update(positive)
-                                    solved = False
-                # Attempt to bulk group
-                # Specify Numbers contained in Negative sets of other Clusters in a Group as negative.
-                negative = set(self.numberSet)
-                for otherCluster in cluster.bulkGroup.clusterList():
-                    if otherCluster is not cluster:
-                        negative &= otherCluster.negative()
-                # Negate the positive Numbers in the other Cluster in another Group.
-                positive = negative - cluster.negative()
-                if len(positive) > 0:
-                    for otherCluster in cluster.linearGroup.clusterList():
-                        if otherCluster is not cluster:
-                            for square in otherCluster.squareList():
-                                if len(positive - square.negative()) > 0:
-                                    print("Negate %s at linear(%d,%d)" % (str(positive), square.col, square.row))
-                                    square.negative().update(positive)
-                                    solved = False                            
-        # Check the status of this board
-        status = "SOLVED"
-        for square in self.squareList():
-            if square.status == "free":
-                if len(square.negative()) == self.length:
-                    # No possible solution for the Square
-                    return "CONFLICTED"
-                else:
-                    # Found a unresolved Square
-                    status = "UNRESOLVED"
-        return status
-
-# Initialize with example board
-def exampleBoard():
-    x = -1
-    Q1 = [
-        x,x,x,3,x,4,x,x,x,
-        x,x,x,x,7,x,9,x,x,
-        x,x,x,x,x,1,x,8,x,
-        1,x,x,x,x,x,4,x,7,
-        x,9,x,x,6,x,x,2,x,
-        4,x,5,x,x,x,x,x,6,
-        x,6,x,2,x,x,x,x,x,
-        x,x,7,x,4,x,x,x,x,
-        x,x,x,8,x,3,x,x,x
-    ]
-    Q2 = [
-        x,x,6,x,x,x,5,x,x,
-        x,x,x,5,x,7,x,x,x,
-        2,x,x,x,x,x,x,x,8,
-        x,4,x,x,6,x,x,7,x,
-        x,x,3,8,x,5,6,x,x,
-        x,9,x,x,3,x,x,8,x,
-        1,x,x,x,x,x,x,x,2,
-        x,x,x,2,x,4,x,x,x,
-        x,x,4,x,x,x,1,x,x
-    ]
-    Q98 = [
-        x,x,x,x,x,9,x,x,4,
-        x,x,x,x,1,x,x,3,x,
-        x,x,x,2,x,8,x,x,7,
-        3,x,2,x,x,x,6,x,x,
-        x,6,x,x,x,x,x,9,x,
-        x,x,4,x,x,x,1,x,8,
-        5,x,x,6,x,1,x,x,x,
-        x,4,x,x,5,x,x,x,x,
-        7,x,x,3,x,x,x,x,x
-    ]
-    Q100 = [
-        x,3,x,x,5,x,x,6,x,
-        7,x,x,1,x,x,x,x,8,
-        x,x,2,x,x,x,x,x,x,
-        x,9,x,x,x,8,4,x,x,
-        x,4,x,x,x,x,x,1,x,
-        x,x,6,7,x,x,x,2,x,
-        x,x,x,x,x,x,3,x,x,
-        5,x,x,x,x,4,x,x,6,
-        x,6,x,x,9,x,x,5,x
-    ]
-    Q130 = [
-        x,1,x,6,x,x,x,5,x,
-        7,2,x,x,x,x,x,x,9,
-        x,x,x,x,x,8,x,x,x,
-        3,x,x,x,1,x,6,x,x,
-        x,x,x,2,x,9,x,x,x,
-        x,x,5,x,4,x,x,x,8,
-        x,x,x,1,x,x,x,x,x,
-        5,x,x,x,x,x,x,3,2,
-        x,9,x,x,x,5,x,1,x
-    ]
-    Qbaka = [
-        x,x,5,3,x,x,x,x,x,
-        x,x,x,x,x,x,x,x,x,
-        x,x,x,x,1,x,5,x,x,
-        4,x,x,x,x,5,3,x,x,
-        x,x,x,x,x,x,x,x,x,
-        x,x,3,2,x,x,x,8,x,
-        x,6,x,x,x,x,x,x,9,
-        x,x,x,x,x,x,x,x,x,
-        x,x,x,x,x,9,7,x,x
-    ]
-    Qhard = [
-        x,x,5,3,x,x,x,x,x,
-        8,x,x,x,x,x,x,2,x,
-        x,7,x,x,1,x,5,x,x,
-        4,x,x,x,x,5,3,x,x,
-        x,1,x,x,7,x,x,x,6,
-        x,x,3,2,x,x,x,8,x,
-        x,6,x,5,x,x,x,x,9,
-        x,x,4,x,x,x,x,3,x,
-        x,x,x,x,x,9,7,x,x
-    ]
-    board = Board(TILE_UNIT)
-    q = Qhard
-    for i in range(len(q)):
-        if q[i] != x:
-            row = int(i / board.length)
-            col = i % board.length
-            board.square(col, row).assign(q[i], "fixed")
-    return board
-
-# Create an example board
-board = exampleBoard()
-
-# Create a window
-root = tkinter.Tk()
-root.title("Sudoku")
-root.option_add("*font", ["メイリオ", 14])
-
-# Frame in the root
-frame=tkinter.Frame()
-
-# Create a canvas
-canvasWidth = TILE_WIDTH * board.length + TILE_GAP
-canvasHeight = TILE_HEIGHT * board.length + TILE_GAP
-
-canvas = tkinter.Canvas(frame, width=canvasWidth, height=canvasHeight, bd=0, highlightthickness=0, relief="ridge")
-canvas.grid(row=0, column=0, columnspan=3, padx=PAD, pady=PAD)
-canvas.create_rectangle(
-    0,
-    0,
-    canvasWidth,
-    canvasHeight,
-    fill="gray80",
-    width=0,
-    tag="board"
-)
-
-# Gray border lines
-c = "gray"
-for i in range(board.length + 1) :
-    x = TILE_WIDTH * i + TILE_GAP * 0.5
-    canvas.create_line(
-        x, 0,
-        x, canvasHeight,
-        fill=c,
-        width=TILE_GAP,
-        tag="board"
-    )
-    y = TILE_HEIGHT * i + TILE_GAP * 0.5
-    canvas.create_line(
-        0, y,
-        canvasWidth, y,
-        fill=c,
-        width=TILE_GAP,
-        tag="board"
-    )
-# Black border lines
-c = "black"
-for i in range(0, board.length + 1, board.unit):
-    x = TILE_WIDTH * i + TILE_GAP * 0.5
-    canvas.create_line(
-        x, 0,
-        x, canvasHeight,
-        fill=c,
-        width=TILE_GAP,
-        tag="board"
-    )
-    y = TILE_HEIGHT * i + TILE_GAP * 0.5
-    canvas.create_line(
-        0, y,
-        canvasWidth, y,
-        fill=c,
-        width=TILE_GAP,
-        tag="board"
-    )
-
-# SOLVE, ASSUME, CLEAR Buttons
-solveButton = tkinter.Button(frame, text="SOLVE")
-solveButton.grid(row=1, column=0, padx=PAD, pady=PAD)
-assumeButton = tkinter.Button(frame, text="ASSUME")
-assumeButton.grid(row=1, column=1, padx=PAD, pady=PAD)
-clearButton = tkinter.Button(frame, text="CLEAR")
-clearButton.grid(row=1, column=2, padx=PAD, pady=PAD)
-
-# Assign field and button
-assignEntry = tkinter.Entry(frame, width=2)
-assignEntry.grid(row=2, column=0, padx=PAD, pady=PAD)
-assignButton = tkinter.Button(frame, text="ASSIGN")
-assignButton.grid(row=2, column=1, padx=PAD, pady=PAD)
-fixButton = tkinter.Button(frame, text="FIX")
-fixButton.grid(row=2, column=2, padx=PAD, pady=PAD)
-
-frame.pack()
+            canvas.itemconfigure(self.rectDict[square], state="hidden")
+            canvas.itemconfigure(
+                self.textDict[square],
+                text=str(number),
+                fill=color,
+                font=TILE_FONT if number < 10 else TILE_SMALL_FONT,
+                state="normal"
+            )
 
 class Pivot:
+    __slots__ = ("f_location",)
+
     def __init__(self):
         self.clear()
-    
+
     def isAssigned(self):
         return self.f_location is not None
-    
+
     def clear(self):
         self.f_location = None
 
@@ -571,194 +126,298 @@ class Pivot:
 
     def row(self):
         return self.f_location[1]
-    
-pivot = Pivot()
-
-# Callback from canvas
-def canvasOnClick(event):
-    x = event.x + TILE_GAP
-    y = event.y + TILE_GAP
-
-    col, x_frac = divmod(x, TILE_WIDTH)
-    row, y_frac = divmod(y, TILE_HEIGHT)
-    if (col < 0 or col >= board.length or row < 0 or row >= board.length):
-        return
-    if x_frac < TILE_GAP * 3 or y_frac < TILE_GAP * 3:
-        print("Frac %d, %d" % (x_frac, y_frac))
-        pivot.clear()
-        return
-    # Get Square information to Entry
-    print("Clicked (%d, %d) %s" % (col, row, board.square(col,row).negative()))
-    pivot.set(col, row)
-    square = board.squareAt(pivot)
-    number = square.number
-    assignEntry.delete(0, tkinter.END)
-    if number is not None:
-        assignEntry.insert(0, str(number))
-
-canvas.bind("<Button-1>", canvasOnClick)
-
-# Callback from SOLVE button
-def solveButtonOnClick():
-    status = board.solve()
-    board.draw(canvas)
-    root.update()
-    print(status)
-
-solveButton["command"]=solveButtonOnClick
-
-# Solution class declaration
-class Solution:
-    # construct an instance with the first branch
-    def __init__(self, board):
-        self.f_solutionStep = list()
-        self.appendStep(board)
-
-    # Append a new step
-    def appendStep(self, board):
-        freeSquare = board.findFreeSquare()
-        self.f_solutionStep.append(
-            (freeSquare, list(set(board.numberSet) - freeSquare.negative()))
+
+# Solver running on a worker thread while the GUI polls its progress
+# The worker owns a BitBoard copy of the Board, the Tk thread only reads
+# the progress and a snapshot of the BitBoard taken on request.
+class Worker:
+    __slots__ = ("bitBoard", "search", "assume", "thread", "status", "depth", "snapshot", "wantSnapshot", "result", "done")
+
+    # constructor
+    # assume runs the search of all solutions, otherwise solve() only
+    def __init__(self, bitBoard, assume):
+        self.bitBoard = bitBoard
+        self.search = Search(bitBoard)
+        self.assume = assume
+        self.status = None
+        self.depth = 0
+        self.snapshot = None
+        self.wantSnapshot = False
+        # Snapshot of the BitBoard to show at the end: the first solution,
+        # or the propagated board when there is none
+        self.result = None
+        self.done = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    # Body of the worker thread
+    def run(self):
+        try:
+            if self.assume:
+                # Search only when propagation leaves the board unresolved
+                self.status = self.bitBoard.solve(self.search.propagation)
+                self.result = self.bitBoard.snapshot()
+                if self.status != "UNRESOLVED":
+                    return
+                print("ALL SOLUTIONS")
+                n = 0
+                for (steps, grid) in self.search.solutions(self.onStep):
+                    if n == 0:
+                        self.result = self.bitBoard.snapshot()
+                    print("#%d %s" % (n, steps))
+                    n = n + 1
+            else:
+                self.status = self.bitBoard.solve("sweep")
+        finally:
+            self.done = True
+
+    # Record the progress after every assumption
+    def onStep(self, solution, status):
+        self.depth = solution.depth()
+        if self.wantSnapshot:
+            self.snapshot = self.bitBoard.snapshot()
+            self.wantSnapshot = False
+
+    # Stop the search at the next assumption
+    def cancel(self):
+        self.search.stop()
+
+    def nodes(self):
+        return self.search.nodes
+
+    def solutions(self):
+        return self.search.found
+
+# Build the window and run the main loop
+def main():
+    # Create an example board, or an empty board of other sizes
+    if TILE_UNIT == UNIT:
+        board = exampleBoard()
+    else:
+        board = Board(TILE_UNIT)
+    trace = PrintTrace() if TRACE else None
+    board.trace = trace
+
+    # Create a window
+    root = tkinter.Tk()
+    root.title("Sudoku")
+    root.option_add("*font", ["メイリオ", 14])
+
+    # Frame in the root
+    frame=tkinter.Frame()
+
+    # Create a canvas
+    canvasWidth = TILE_WIDTH * board.length + TILE_GAP
+    canvasHeight = TILE_HEIGHT * board.length + TILE_GAP
+
+    canvas = tkinter.Canvas(frame, width=canvasWidth, height=canvasHeight, bd=0, highlightthickness=0, relief="ridge")
+    canvas.grid(row=0, column=0, columnspan=3, padx=PAD, pady=PAD)
+    canvas.create_rectangle(
+        0,
+        0,
+        canvasWidth,
+        canvasHeight,
+        fill="gray80",
+        width=0,
+        tag="board"
+    )
+
+    # Gray border lines
+    c = "gray"
+    for i in range(board.length + 1) :
+        x = TILE_WIDTH * i + TILE_GAP * 0.5
+        canvas.create_line(
+            x, 0,
+            x, canvasHeight,
+            fill=c,
+            width=TILE_GAP,
+            tag="board"
+        )
+        y = TILE_HEIGHT * i + TILE_GAP * 0.5
+        canvas.create_line(
+            0, y,
+            canvasWidth, y,
+            fill=c,
+            width=TILE_GAP,
+            tag="board"
+        )
+    # Black border lines
+    c = "black"
+    for i in range(0, board.length + 1, board.unit):
+        x = TILE_WIDTH * i + TILE_GAP * 0.5
+        canvas.create_line(
+            x, 0,
+            x, canvasHeight,
+            fill=c,
+            width=TILE_GAP,
+            tag="board"
+        )
+        y = TILE_HEIGHT * i + TILE_GAP * 0.5
+        canvas.create_line(
+            0, y,
+            canvasWidth, y,
+            fill=c,
+            width=TILE_GAP,
+            tag="board"
         )
 
-    # Prune the last step
-    def pruneStep(self):
-        self.f_solutionStep.pop(-1)
-
-    # Prune a leaf from the solution
-    def pruneLeaf(self):
-        while not self.isEmpty():
-            (square, choice) = self.lastStep()
-            # Prune first choice
-            choice.pop(0)
-            if len(choice) > 0:
-                # Prune finished
-                break
-            # Prune last step
-            self.pruneStep()
-
-    # return a list of steps
-    def stepList(self):
-        for step in self.f_solutionStep:
-            yield step
-    
-    # return the last step
-    def lastStep(self):
-        return self.f_solutionStep[-1]
-    
-    # true if solution steps are empty
-    def isEmpty(self):
-        return not bool(self.f_solutionStep)
-
-    # return a string description of the last step
-    def lastStepString(self):
-        (square, choice) = self.lastStep()
-        return "%s(%d,%d)=%s" % (
-                " " * len(self.f_solutionStep),
-                square.col, square.row,
-                str(choice[0])
+    # SOLVE, ASSUME, CLEAR Buttons
+    solveButton = tkinter.Button(frame, text="SOLVE")
+    solveButton.grid(row=1, column=0, padx=PAD, pady=PAD)
+    assumeButton = tkinter.Button(frame, text="ASSUME")
+    assumeButton.grid(row=1, column=1, padx=PAD, pady=PAD)
+    clearButton = tkinter.Button(frame, text="CLEAR")
+    clearButton.grid(row=1, column=2, padx=PAD, pady=PAD)
+
+    # Assign field and button
+    assignEntry = tkinter.Entry(frame, width=2)
+    assignEntry.grid(row=2, column=0, padx=PAD, pady=PAD)
+    assignButton = tkinter.Button(frame, text="ASSIGN")
+    assignButton.grid(row=2, column=1, padx=PAD, pady=PAD)
+    fixButton = tkinter.Button(frame, text="FIX")
+    fixButton.grid(row=2, column=2, padx=PAD, pady=PAD)
+
+    # Cancel button and progress of a running solver
+    cancelButton = tkinter.Button(frame, text="CANCEL", state="disabled")
+    cancelButton.grid(row=3, column=0, padx=PAD, pady=PAD)
+    progressLabel = tkinter.Label(frame, text="")
+    progressLabel.grid(row=3, column=1, columnspan=2, padx=PAD, pady=PAD)
+    editButtonList = [solveButton, assumeButton, clearButton, assignButton, fixButton]
+
+    frame.pack()
+
+    view = BoardView(canvas, board)
+
+    pivot = Pivot()
+
+    # Callback from canvas
+    def canvasOnClick(event):
+        x = event.x + TILE_GAP
+        y = event.y + TILE_GAP
+
+        col, x_frac = divmod(x, TILE_WIDTH)
+        row, y_frac = divmod(y, TILE_HEIGHT)
+        if (col < 0 or col >= board.length or row < 0 or row >= board.length):
+            return
+        if x_frac < TILE_GAP * 3 or y_frac < TILE_GAP * 3:
+            if trace is not None:
+                trace.message("Frac %d, %d" % (x_frac, y_frac))
+            pivot.clear()
+            return
+        # Get Square information to Entry
+        if trace is not None:
+            trace.emit(TraceEvent(RULE_CLICK, (col, row), sorted(board.square(col,row).negative())))
+        pivot.set(col, row)
+        square = board.squareAt(pivot)
+        number = square.number
+        assignEntry.delete(0, tkinter.END)
+        if number is not None:
+            assignEntry.insert(0, str(number))
+
+    canvas.bind("<Button-1>", canvasOnClick)
+
+    # Start a solver on a worker thread and poll it until it is done
+    # finish(worker) is called on the Tk thread at the end.
+    def startWorker(assume, finish):
+        bitBoard = BitBoard(board.unit)
+        bitBoard.loadBoard(board)
+        bitBoard.trace = trace
+        worker = Worker(bitBoard, assume)
+        displayBoard = BitBoard(board.unit)
+        for button in editButtonList:
+            button["state"] = "disabled"
+        cancelButton["state"] = "normal" if assume else "disabled"
+        cancelButton["command"] = worker.cancel
+        def poll():
+            if worker.done:
+                for button in editButtonList:
+                    button["state"] = "normal"
+                cancelButton["state"] = "disabled"
+                progressLabel["text"] = ""
+                finish(worker)
+                view.draw()
+                return
+            # Show the latest snapshot and ask for the next one
+            if worker.snapshot is not None:
+                displayBoard.restore(worker.snapshot)
+                displayBoard.storeBoard(board)
+                view.draw()
+                worker.snapshot = None
+            worker.wantSnapshot = True
+            progressLabel["text"] = "nodes %d depth %d solutions %d" % (
+                worker.nodes(), worker.depth, worker.solutions()
             )
+            root.after(FRAME_MS, poll)
+        worker.start()
+        root.after(FRAME_MS, poll)
+
+    # Callback from SOLVE button
+    def solveButtonOnClick():
+        def finish(worker):
+            worker.bitBoard.storeBoard(board)
+            print(worker.status)
+        startWorker(False, finish)
+
+    solveButton["command"]=solveButtonOnClick
+
+    # Callback from ASSUME button
+    def assumeButtonOnClick():
+        def finish(worker):
+            # Show the first solution
+            worker.bitBoard.restore(worker.result)
+            worker.bitBoard.storeBoard(board)
+            if worker.search.stopped:
+                print("CANCELLED")
+        startWorker(True, finish)
+
+    assumeButton["command"]=assumeButtonOnClick
+
+    # Callback from CLEAR button
+    def clearButtonOnClick():
+        pivot.clear()
+        assignEntry.delete(0, tkinter.END)
+        board.unassign()
+        board.resetNegative()
+        view.draw()
+        root.update()
 
-    # return a snapshot of current solution
-    def snapshot(self):
-        return [
-            ((square.col, square.row), choice[0])
-            for (square, choice) in self.stepList()
-        ]
-
-# Callback from ASSUME button
-def assumeButtonOnClick():
-    status = board.solve()
-    if status == "UNRESOLVED":
-        solution = Solution(board)
-        solutionList = list()
-        while True:
-            # Try a solution
-            board.unassign()
-            board.resetNegative()
-            for (square, choice) in solution.stepList():
-#                print("Assume (%d,%d) as %s" % (square.col, square.row, str(choice[0])))
-                square.assign(choice[0])
-            status = board.solve()
-            board.draw(canvas)
+    clearButton["command"] = clearButtonOnClick
+
+    # Callback from ASSIGN button
+    def assignButtonOnClick():
+        if pivot.isAssigned():
+            try:
+                number = int(assignEntry.get())
+                board.squareAt(pivot).assign(number)
+            except ValueError:
+                board.squareAt(pivot).unassign()
+            view.draw()
             root.update()
-            # Show last step as LOG
-            print("%s (%s)" % (solution.lastStepString(), status))
-            if status == "SOLVED":
-                # Record the solution
-                solutionList.append(solution.snapshot())
-                # Prune a leaf
-                solution.pruneLeaf()
-                if solution.isEmpty():
-                    # All solutions are scanned
-                    break
-            elif status == "CONFLICTED":
-                # Prune a leaf
-                solution.pruneLeaf()
-                if solution.isEmpty():
-                    # All solutions are scanned
-                    break
-            elif status == "UNRESOLVED":
-                # Select a new step
-                solution.appendStep(board)
-        # Playback the first Snapshot
-        if solutionList:
-            board.unassign()
-            board.resetNegative()
-            for ((col, row), number) in solutionList[0]:
-                board.square(col, row).assign(number)
-            status = board.solve()
-        print("ALL SOLUTIONS")
-        n = 0
-        for steps in solutionList:
-            print("#%d %s" % (n, steps))
-            n = n + 1
-    board.draw(canvas)
-    root.update()
-
-assumeButton["command"]=assumeButtonOnClick
-
-# Callback from CLEAR button
-def clearButtonOnClick():
-    pivot.clear()
-    assignEntry.delete(0, tkinter.END)
-    board.unassign()
-    board.resetNegative()
-    board.draw(canvas)
-    root.update()
-
-clearButton["command"] = clearButtonOnClick
-
-# Callback from ASSIGN button
-def assignButtonOnClick():
-    if pivot.isAssigned():
-        try:
-            number = int(assignEntry.get())
-            board.squareAt(pivot).assign(number)
-        except ValueError:
-            board.squareAt(pivot).unassign()
-        board.draw(canvas)
-        root.update()
 
-assignButton["command"] = assignButtonOnClick
+    assignButton["command"] = assignButtonOnClick
+
+    # Callback from FIX button
+    def fixButtonOnClick():
+        if pivot.isAssigned():
+            try:
+                number = int(assignEntry.get())
+                board.squareAt(pivot).assign(number, "fixed")
+            except ValueError:
+                board.squareAt(pivot).unassign()
+            view.draw()
+            root.update()
 
-# Callback from FIX button
-def fixButtonOnClick():
-    if pivot.isAssigned():
-        try:
-            number = int(assignEntry.get())
-            board.squareAt(pivot).assign(number, "fixed")
-        except ValueError:
-            board.squareAt(pivot).unassign()
-        board.draw(canvas)
-        root.update()
+    fixButton["command"] = fixButtonOnClick
 
-fixButton["command"] = fixButtonOnClick
+    # Draw the board
+    view.draw()
 
-# Draw the board
-board.draw(canvas)
+    # the main loop
+    root.mainloop()
 
-# the main loop
-root.mainloop()
+    print("Done")
 
-print("Done")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Static index tables of a board
+# The tables only depend on the unit of a board, so they are built once per
+# unit and shared by every board as tuples of Square or Cluster indices.
+
+from array import array
+from functools import lru_cache
+
+# topology class
+class Topology:
+    # constructor
+    def __init__(self, unit):
+        self.unit = unit
+        # define board length
+        self.length = unit * unit
+        self.size = self.length * self.length
+        # Mask of all number to be put
+        self.fullMask = (1 << self.length) - 1
+        self.numberSet = frozenset({i+1 for i in range(self.length)})
+        # Initial value of every per-Square state
+        self.zeros = (0,) * self.size
+        # array typecode holding a negative mask in a snapshot
+        for typecode in "HIQ":
+            if array(typecode).itemsize * 8 >= self.length:
+                self.maskTypecode = typecode
+                break
+        self.snapshotSize = self.size * (2 + array(self.maskTypecode).itemsize)
+        self.build()
+
+    # Build index tables corresponding to Cluster and Group of Board
+    def build(self):
+        unit = self.unit
+        length = self.length
+        # Clusters in the same order as Board.clusterList()
+        clusterSquares = list()
+        hClusterBase = 0
+        for row in range(length):
+            for cbase in range(0, length, unit):
+                clusterSquares.append(
+                    tuple(row * length + col for col in range(cbase, cbase + unit))
+                )
+        vClusterBase = len(clusterSquares)
+        for col in range(length):
+            for rbase in range(0, length, unit):
+                clusterSquares.append(
+                    tuple(row * length + col for row in range(rbase, rbase + unit))
+                )
+        self.clusterSquares = tuple(clusterSquares)
+        # Groups in the same order as Board.groupList(), as lists of Cluster
+        groupClusters = list()
+        linearGroup = [None] * len(clusterSquares)
+        bulkGroup = [None] * len(clusterSquares)
+        for row in range(length):
+            groupClusters.append([hClusterBase + row * unit + col for col in range(unit)])
+            for cluster in groupClusters[-1]:
+                linearGroup[cluster] = len(groupClusters) - 1
+        for rbase in range(0, length, unit):
+            for col in range(unit):
+                groupClusters.append([hClusterBase + row * unit + col for row in range(rbase, rbase + unit)])
+                for cluster in groupClusters[-1]:
+                    bulkGroup[cluster] = len(groupClusters) - 1
+        for col in range(length):
+            groupClusters.append([vClusterBase + col * unit + row for row in range(unit)])
+            for cluster in groupClusters[-1]:
+                linearGroup[cluster] = len(groupClusters) - 1
+        for cbase in range(0, length, unit):
+            for row in range(unit):
+                groupClusters.append([vClusterBase + col * unit + row for col in range(cbase, cbase + unit)])
+                for cluster in groupClusters[-1]:
+                    bulkGroup[cluster] = len(groupClusters) - 1
+        self.groupClusters = tuple(tuple(clusters) for clusters in groupClusters)
+        self.groupSquares = tuple(
+            tuple(square for cluster in clusters for square in clusterSquares[cluster])
+            for clusters in groupClusters
+        )
+        self.linearGroup = tuple(linearGroup)
+        self.bulkGroup = tuple(bulkGroup)
+        # Other Clusters in the linear and bulk Group of each Cluster
+        self.linearOthers = tuple(
+            tuple(other for other in groupClusters[linearGroup[cluster]] if other != cluster)
+            for cluster in range(len(clusterSquares))
+        )
+        self.bulkOthers = tuple(
+            tuple(other for other in groupClusters[bulkGroup[cluster]] if other != cluster)
+            for cluster in range(len(clusterSquares))
+        )
+        # Squares of the other Clusters in the linear and bulk Group of each Cluster
+        self.linearOtherSquares = tuple(
+            tuple(square for other in others for square in clusterSquares[other])
+            for others in self.linearOthers
+        )
+        self.bulkOtherSquares = tuple(
+            tuple(square for other in others for square in clusterSquares[other])
+            for others in self.bulkOthers
+        )
+        # Groups containing each Square
+        squareGroups = [list() for index in range(self.size)]
+        for group in range(len(self.groupSquares)):
+            for index in self.groupSquares[group]:
+                squareGroups[index].append(group)
+        self.squareGroups = tuple(tuple(groups) for groups in squareGroups)
+        # Clusters whose rule depends on the negative set of each Square
+        squareNeighborClusters = [list() for index in range(self.size)]
+        for cluster in range(len(clusterSquares)):
+            neighbors = (cluster,) + self.linearOthers[cluster] + self.bulkOthers[cluster]
+            for index in clusterSquares[cluster]:
+                squareNeighborClusters[index].extend(neighbors)
+        self.squareNeighborClusters = tuple(tuple(clusters) for clusters in squareNeighborClusters)
+        # Groups with distinct Squares: rows, columns and boxes once each
+        # A box is both the bulk Group of its horizontal and vertical Clusters.
+        houseGroups = list()
+        houseSet = set()
+        for group in range(len(self.groupSquares)):
+            squares = frozenset(self.groupSquares[group])
+            if squares not in houseSet:
+                houseSet.add(squares)
+                houseGroups.append(group)
+        self.houseGroups = tuple(houseGroups)
+        # Squares sharing a Group with each Square
+        peers = list()
+        for index in range(self.size):
+            peerSet = set()
+            for group in squareGroups[index]:
+                peerSet.update(self.groupSquares[group])
+            peerSet.discard(index)
+            peers.append(tuple(sorted(peerSet)))
+        self.peers = tuple(peers)
+
+# return the shared Topology of a unit
+@lru_cache(maxsize=None)
+def topology(unit):
+    return Topology(unit)
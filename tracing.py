@@ -0,0 +1,119 @@
+# Trace sinks of solver events
+# A solver holds a sink in its trace attribute. None disables tracing,
+# then the rules only pay for a test against None and no event is built.
+# An event records the rule, the cell (col, row), the numbers and the search depth.
+
+import sys
+
+# Rules reported in events
+RULE_LAST_POSITIVE = "last positive"
+RULE_LAST_IN_GROUP = "last in group"
+RULE_NEGATE_BULK = "negate bulk"
+RULE_NEGATE_LINEAR = "negate linear"
+RULE_INDIRECT_CLUSTER = "indirect cluster"
+RULE_NAKED_SUBSET = "naked subset"
+RULE_HIDDEN_SUBSET = "hidden subset"
+RULE_FISH = "fish"
+RULE_ASSUME = "assume"
+RULE_CLICK = "click"
+
+# trace event class
+class TraceEvent:
+    __slots__ = ("rule", "cell", "numbers", "depth", "status")
+
+    # constructor
+    # status is the board status after an assumption, None for other rules
+    def __init__(self, rule, cell, numbers, depth=0, status=None):
+        self.rule = rule
+        self.cell = cell
+        self.numbers = numbers
+        self.depth = depth
+        self.status = status
+
+    # return a dict of the event
+    def record(self):
+        record = {
+            "rule": self.rule,
+            "cell": list(self.cell),
+            "numbers": list(self.numbers),
+            "depth": self.depth
+        }
+        if self.status is not None:
+            record["status"] = self.status
+        return record
+
+# Base class of trace sinks
+class TraceSink:
+    # Receive an event
+    def emit(self, event):
+        pass
+
+    # Receive free text for debugging
+    def message(self, text):
+        pass
+
+    # Start the trace of a new puzzle
+    def begin(self, puzzle):
+        pass
+
+# Sink printing events as the log lines of the solver
+class PrintTrace(TraceSink):
+    # constructor, stream is sys.stdout when None
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, text):
+        print(text, file=self.stream if self.stream is not None else sys.stdout)
+
+    def emit(self, event):
+        (col, row) = event.cell
+        if event.rule == RULE_LAST_POSITIVE:
+            self.write("Last positive %d at (%d,%d)" % (event.numbers[0], col, row))
+        elif event.rule == RULE_LAST_IN_GROUP:
+            self.write("Last in group %d at (%d,%d)" % (event.numbers[0], col, row))
+        elif event.rule == RULE_NEGATE_BULK:
+            self.write("Negate %s at bulk(%d,%d)" % (set(event.numbers), col, row))
+        elif event.rule == RULE_NEGATE_LINEAR:
+            self.write("Negate %s at linear(%d,%d)" % (set(event.numbers), col, row))
+        elif event.rule in (RULE_NAKED_SUBSET, RULE_HIDDEN_SUBSET, RULE_FISH):
+            self.write("Negate %s at %s(%d,%d)" % (set(event.numbers), event.rule.replace(" ", "-"), col, row))
+        elif event.rule == RULE_ASSUME:
+            self.write("%s(%d,%d)=%d (%s)" % (" " * event.depth, col, row, event.numbers[0], event.status))
+        elif event.rule == RULE_CLICK:
+            self.write("Clicked (%d, %d) %s" % (col, row, set(event.numbers)))
+
+    def message(self, text):
+        self.write(text)
+
+    def begin(self, puzzle):
+        self.write(puzzle)
+
+# Sink keeping events in a list
+class ListTrace(TraceSink):
+    # constructor
+    def __init__(self):
+        self.eventList = list()
+
+    def emit(self, event):
+        self.eventList.append(event)
+
+# Sink writing events as JSON objects, one per line
+# json is imported here so that importing the engine does not load it.
+class JsonTrace(TraceSink):
+    # constructor
+    def __init__(self, stream):
+        import json
+        self.stream = stream
+        self.dumps = json.dumps
+
+    def emit(self, event):
+        self.stream.write(self.dumps(event.record()))
+        self.stream.write("\n")
+
+    def message(self, text):
+        self.stream.write(self.dumps({"message": text}))
+        self.stream.write("\n")
+
+    def begin(self, puzzle):
+        self.stream.write(self.dumps({"puzzle": puzzle}))
+        self.stream.write("\n")
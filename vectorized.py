@@ -0,0 +1,152 @@
+# Propagation of many boards at once with NumPy
+# A VectorBoards propagates a list of puzzles of one unit together. The
+# puzzles are held as an (N, size) array of numbers, 0 for a free Square,
+# and Solver #1 (last positive) and Solver #2 (last positive in group) of
+# Board.solve() are applied to all of them at every round through the
+# index tables of the Topology, until no board changes. The candidate masks
+# of the Squares and the placed numbers of the houses are kept across rounds
+# and only the houses of the newly assigned Squares update them. Boards left
+# unresolved go on to the search one by one.
+#
+# NumPy is optional, available() tells whether it could be imported.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from engine import BLANK
+from topology import topology
+
+# true when NumPy can be imported
+def available():
+    return numpy is not None
+
+# Smallest unsigned dtype holding a mask of length numbers
+def maskType(length):
+    for dtype in (numpy.uint16, numpy.uint32, numpy.uint64):
+        if numpy.iinfo(dtype).bits >= length:
+            return dtype
+    raise ValueError("board length %d does not fit a mask" % length)
+
+# vectorized boards class
+class VectorBoards:
+    __slots__ = ("unit", "length", "size", "fullMask", "bitList", "numberBit", "houses", "squareHouses")
+
+    # constructor
+    def __init__(self, unit):
+        if numpy is None:
+            raise ImportError("vector propagation requires NumPy")
+        topo = topology(unit)
+        self.unit = unit
+        self.length = topo.length
+        self.size = topo.size
+        dtype = maskType(self.length)
+        self.fullMask = dtype(topo.fullMask)
+        # bitList[n - 1] is the mask of number n, numberBit[n] too with 0 for 0
+        self.bitList = numpy.array([1 << n for n in range(self.length)], dtype=dtype)
+        self.numberBit = numpy.concatenate((numpy.zeros(1, dtype=dtype), self.bitList))
+        # (nHouse, length) Squares of each row, column and box
+        self.houses = numpy.array(
+            [topo.groupSquares[group] for group in topo.houseGroups], dtype=numpy.intp
+        )
+        # (size, 3) houses of each Square
+        squareHouses = [list() for index in range(self.size)]
+        for (house, squares) in enumerate(self.houses.tolist()):
+            for index in squares:
+                squareHouses[index].append(house)
+        self.squareHouses = numpy.array(squareHouses, dtype=numpy.intp)
+
+    # Propagate puzzles given as serial lists, BLANK for a free Square
+    # return a list of (status, q): q is the serial list after propagation,
+    # status is "SOLVED", "CONFLICTED" or "UNRESOLVED"
+    def propagate(self, qList):
+        if not qList:
+            return list()
+        for q in qList:
+            if len(q) != self.size:
+                raise ValueError("puzzle length %d does not fit the board" % len(q))
+        result = numpy.array(qList, dtype=numpy.int64)
+        result[result == BLANK] = 0
+        conflicted = numpy.zeros(len(qList), dtype=bool)
+        # Numbers, candidates and house masks of the boards still changing,
+        # kept across rounds and updated by the newly assigned Squares only
+        number = result
+        placed = self.numberBit[number]
+        (housePlaced, twice) = self.houseMasks(placed)
+        candidate = self.fullMask & ~self.peerMask(housePlaced)
+        candidate[number != 0] = 0
+        active = numpy.arange(len(qList))
+        conflict = (twice != 0).any(axis=1)
+        while True:
+            (place, placeMask, roundConflict) = self.round(number, candidate, housePlaced)
+            conflict |= roundConflict
+            conflicted[active[conflict]] = True
+            changed = (placeMask != 0).any(axis=1) & ~conflict
+            result[active] = number
+            if not changed.any():
+                break
+            active = active[changed]
+            number = numpy.where(placeMask != 0, place, number)[changed]
+            candidate = candidate[changed]
+            housePlaced = housePlaced[changed]
+            placeMask = placeMask[changed]
+            # Remove the new numbers from the candidates of their peers
+            (newPlaced, twice) = self.houseMasks(placeMask)
+            housePlaced |= newPlaced
+            candidate &= ~self.peerMask(newPlaced)
+            candidate[placeMask != 0] = 0
+            # A number assigned twice in a house
+            conflict = (twice != 0).any(axis=1)
+        resultList = list()
+        for (i, row) in enumerate(result.tolist()):
+            if conflicted[i]:
+                status = "CONFLICTED"
+            elif 0 in row:
+                status = "UNRESOLVED"
+            else:
+                status = "SOLVED"
+            resultList.append((status, [n if n else BLANK for n in row]))
+        return resultList
+
+    # Combine an (A, size) array of masks over each house
+    # return (once, twice): (A, nHouse) arrays of the bits set in some and
+    # in at least two Squares of each house
+    def houseMasks(self, mask):
+        once = numpy.zeros((len(mask), len(self.houses)), dtype=mask.dtype)
+        twice = numpy.zeros_like(once)
+        for i in range(self.length):
+            bits = mask[:, self.houses[:, i]]
+            twice |= once & bits
+            once |= bits
+        return (once, twice)
+
+    # Spread an (A, nHouse) array of masks to the Squares of each house
+    # return the (A, size) array of the union over the houses of each Square
+    def peerMask(self, houseMask):
+        squareHouses = self.squareHouses
+        mask = houseMask[:, squareHouses[:, 0]]
+        for k in range(1, squareHouses.shape[1]):
+            mask |= houseMask[:, squareHouses[:, k]]
+        return mask
+
+    # Apply Solver #1 and #2 once to (A, size) arrays of numbers, 0 for a
+    # free Square, and candidates, and the (A, nHouse) array of placed numbers
+    # return (place, placeMask, conflict): place and placeMask are the
+    # (A, size) arrays of the numbers to assign and their masks, 0 for none,
+    # conflict marks the boards having no solution
+    def round(self, number, candidate, housePlaced):
+        (once, twice) = self.houseMasks(candidate)
+        # A number neither placed nor a candidate in a house
+        conflict = ((once | housePlaced) != self.fullMask).any(axis=1)
+        # A free Square without candidates
+        conflict |= ((number == 0) & (candidate == 0)).any(axis=1)
+        # Solver #2: Last positive in group, a number with a single Square in a house
+        placeMask = candidate & self.peerMask(once & ~twice)
+        # Solver #1: Last positive, a free Square with a single candidate
+        single = (candidate & (candidate - 1)) == 0
+        placeMask = numpy.where(single, candidate, placeMask)
+        # A Square forced to two numbers at once
+        conflict |= ((placeMask & (placeMask - 1)) != 0).any(axis=1)
+        place = numpy.searchsorted(self.bitList, placeMask) + 1
+        return (place, placeMask, conflict)